@@ -11,6 +11,8 @@ function res = QFT6(qs)
     res = complex(qs);
 
     Rs = cellfun(@(x) [1; exp(2*pi*1i/2^x)], num2cell(1:n), UniformOutput=false);
+    Rs{1} = 1;
+    rots = Rs{1};
 
     for i = 0:n-1
         blk_len = blk_len/2; % ... = 2^(n-i-1)
@@ -22,11 +24,8 @@ function res = QFT6(qs)
         res = reshape(res, blk_len, 2, []);
         v1 = res(:, 1, :);
 
-        % form rotation gates
-        rots = 1;
-        for j = i+1:-1:2
-            rots = kron(rots, Rs{j});
-        end
+        % grow the rotation gates: rots = kron(Rs{i+1}, ..., Rs{2})
+        rots = kron(Rs{i+1}, rots);
 
         % apply rotations to the more signigicant bits of the qs where i-th
         % bit is 1
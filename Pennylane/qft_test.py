@@ -1,130 +1,122 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import time
-import threading
 import tracemalloc
-import psutil
-import cpuinfo
 import numpy as np
+import sys
+from pathlib import Path
 
-import pennylane as qml
-
-process = psutil.Process(os.getpid())
-peak_rss = 0
-running = True
-
-
-def poll_memory(interval=0.01):
-    """Poll RSS memory (resident set size) in a background thread."""
-    global peak_rss
-    while running:
-        rss = process.memory_info().rss
-        peak_rss = max(peak_rss, rss)
-        time.sleep(interval)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from bench.backends.pennylane import device, samples_to_counts
+from bench.environment import capture, describe
+from bench.memory import PeakMemory
+from bench.runner import parse_dims
+from bench.states import StateProvider
 
+import pennylane as qml
 
-def random_complex_unit_vector(n: int) -> np.ndarray:
-    """Random normalized complex vector of length n."""
-    real = np.random.normal(size=n)
-    imag = np.random.normal(size=n)
-    v = real + 1j * imag
-    v /= np.linalg.norm(v)
-    return v.astype(np.complex128)
-
-
-def samples_to_counts(samples: np.ndarray) -> dict:
-    """
-    Convert PennyLane samples to a Qiskit-like counts dict:
-    keys are bitstrings, values are counts.
-
-    samples shape: (shots, n_wires) with entries 0/1
-    """
-    # Convert each row to a bitstring, e.g. [1 0 1] -> "101"
-    bitstrings = ["".join(map(str, row.tolist())) for row in samples]
-    unique, counts = np.unique(bitstrings, return_counts=True)
-    return {k: int(v) for k, v in zip(unique, counts)}
+# RSS peak per n from the kernel high-water mark (no polling thread)
+memory = PeakMemory()
 
 
 # -------------------------
 # Configuration
 # -------------------------
-min_qubits = 24
-max_qubits = 28 + 1
-shots = 1024
-
-# Choose device:
+parser = argparse.ArgumentParser(description="PennyLane QFT benchmark")
 # - "default.qubit": pure Python, baseline
 # - "lightning.qubit": faster CPU backend (if available in your install)
-device_name = "default.qubit"  # change to "lightning.qubit" if desired
-#device_name = "lightning.gpu"
-#device_name = "lightning.qubit"
-
-
-time_init = np.zeros(max_qubits)
-time_composition = np.zeros(max_qubits)
-time_compile = np.zeros(max_qubits)  # Pennylane "compile" step
-time_sim = np.zeros(max_qubits)
-time_total = np.zeros(max_qubits)
-
-max_mem = np.zeros(max_qubits)       # RSS peak via psutil polling
-max_malloc = np.zeros(max_qubits)    # peak Python allocations via tracemalloc
-
-# Print CPU info (similar to your script)
-info = cpuinfo.get_cpu_info()
-print(f"CPU Marke/Name: {info.get('brand_raw', 'unknown')}")
-print(f"Anzahl Kerne: {info.get('count', 'unknown')}")
-print(f"Architektur: {info.get('arch', 'unknown')}")
-flags = info.get("flags", [])
-print(f"Flags: {flags}")
-
-print(f"PennyLane device: {device_name}, shots={shots}")
-
-for n in range(min_qubits, max_qubits):
+parser.add_argument("-d", "--device", action="append",
+                    help="PennyLane device, repeatable (default: default.qubit)")
+parser.add_argument("-n", "--dims", default="24:28", help='qubit counts, e.g. "24:28" or "4,8"')
+parser.add_argument("-r", "--repeat", type=int, default=1, help="runs per device and n")
+parser.add_argument("--shots", type=int, default=1024)
+parser.add_argument("--readout", choices=("shots", "state"), default="shots",
+                    help="sample shots or return qml.state() without sampling")
+parser.add_argument("--no-compile", action="store_true", help="skip qml.compile")
+parser.add_argument("--new-device", action="store_true",
+                    help="create a new device for every run instead of reusing it")
+args = parser.parse_args()
+
+dims = parse_dims(args.dims)
+device_names = args.device or ["default.qubit"]
+shots = args.shots if args.readout == "shots" else None
+seed = int(os.getenv("QFT_SEED", "0"))  # input states are shared with the other frameworks
+max_qubits = max(dims) + 1
+
+# one entry per (device, n, repetition); the summary reports the median time and the largest peak
+shape = (len(device_names), max_qubits, args.repeat)
+time_init = np.zeros(shape)
+time_composition = np.zeros(shape)
+time_compile = np.zeros(shape)  # Pennylane "compile" step
+time_sim = np.zeros(shape)
+time_total = np.zeros(shape)
+
+max_mem = np.zeros(shape)       # RSS peak via VmHWM
+max_malloc = np.zeros(shape)    # peak Python allocations via tracemalloc
+
+states = StateProvider(seed=seed)
+
+# Print host info (cached per boot, see bench/environment.py)
+env = capture()
+cpu = env["hardware"]["cpu"]
+print(f"CPU Marke/Name: {cpu['model'] or 'unknown'}")
+print(f"Anzahl Kerne: {cpu['logical_cores']}")
+print(f"Architektur: {cpu['arch']}")
+print(f"SIMD: {', '.join(cpu['simd'])}")
+print(f"Umgebung: {describe(env)}")
+
+print(f"PennyLane devices: {', '.join(device_names)}, readout={args.readout}, shots={shots}")
+
+runs = ((d, name, n, r) for d, name in enumerate(device_names) for n in dims for r in range(args.repeat))
+for d, device_name, n, rep in runs:
     num_qubits = n
     wires = list(range(num_qubits))
 
     # tracemalloc for Python-level allocation tracking
     tracemalloc.start()
 
-    # --- start RSS polling ---
-    running = True
-    peak_rss = 0
-    thread = threading.Thread(target=poll_memory, daemon=True)
-    thread.start()
+    # --- start RSS peak window ---
+    memory.start()
 
     # --- init random statevector ---
     print(f"Prepare statevector n={n}")
     start_init = time.perf_counter()
-    psi0 = random_complex_unit_vector(2**num_qubits)
+    psi0 = np.array(states.get(num_qubits), dtype=np.complex128)
     end_init = time.perf_counter()
     init_time = end_init - start_init
 
     # --- build circuit / QNode ---
-    print("Building circuit...")
+    print(f"Building circuit on {device_name} (run {rep + 1}/{args.repeat})...")
     start0 = time.perf_counter()
 
-    dev = qml.device(device_name, wires=num_qubits, shots=shots)
+    # devices are created once per (device, n, shots) unless --new-device
+    dev = device(device_name, num_qubits, shots, reuse=not args.new_device)
 
-    def circuit():
+    def circuit(psi):
         # Equivalent to initial_statevector=psi0 in Qiskit Aer
-        qml.StatePrep(psi0, wires=wires)
+        qml.StatePrep(psi, wires=wires)
 
         # QFT
         qml.QFT(wires=wires)
 
+        if args.readout == "state":
+            # final statevector, no sampling
+            return qml.state()
         # measurement: sample all qubits -> later convert to counts
         return qml.sample(wires=wires)
 
-    # QNode creation roughly corresponds to “composition”
-    qnode = qml.QNode(circuit, dev)
+    # QNode creation roughly corresponds to “composition”;
+    # nothing is differentiated, so no gradient method is set up
+    qnode = qml.QNode(circuit, dev, diff_method=None)
 
     end0 = time.perf_counter()
     composition_time = end0 - start0
 
     # --- "compile" step (optional but mirrors a transpile-like phase) ---
     # This applies PennyLane's compilation/optimization pipeline.
-    # If you want a pure baseline without compile, set do_compile=False.
-    do_compile = True
+    # For a pure baseline without compile, pass --no-compile.
+    do_compile = not args.no_compile
 
     print("Starting compile...")
     start1 = time.perf_counter()
@@ -138,42 +130,47 @@ for n in range(min_qubits, max_qubits):
     # --- run simulation ---
     print("Run simulation...")
     start2 = time.perf_counter()
-    samples = qnode_compiled()
+    output = qnode_compiled(psi0)
     end2 = time.perf_counter()
     sim_time = end2 - start2
 
-    # --- stop polling ---
-    running = False
-    thread.join()
+    # --- stop RSS peak window ---
+    memory.stop()
 
-    # convert samples -> counts (Qiskit-style)
-    counts = samples_to_counts(np.asarray(samples))
+    # convert samples -> counts (outcome integer, wire 0 = MSB)
+    if args.readout == "shots":
+        counts = samples_to_counts(np.asarray(output))
 
     # collect metrics
-    time_init[n] = init_time
-    time_composition[n] = composition_time
-    time_compile[n] = compile_time
-    time_sim[n] = sim_time
-    time_total[n] = composition_time + compile_time + sim_time
-    max_mem[n] = peak_rss
+    time_init[d, n, rep] = init_time
+    time_composition[d, n, rep] = composition_time
+    time_compile[d, n, rep] = compile_time
+    time_sim[d, n, rep] = sim_time
+    time_total[d, n, rep] = composition_time + compile_time + sim_time
+    max_mem[d, n, rep] = memory.peak_rss
 
     current, peak = tracemalloc.get_traced_memory()
-    max_malloc[n] = peak
+    max_malloc[d, n, rep] = peak
     tracemalloc.stop()
 
-    # per-n output line (close to your format)
+    # per-run output line (close to your format)
+    i = (d, n, rep)
     print(
-        f"{n} ... {time_init[n]:.2f}s ... {time_composition[n]:.2f}s ... "
-        f"{time_compile[n]:.2f}s ... {time_sim[n]:.2f}s ... {time_total[n]:.2f}s ... "
-        f"{max_mem[n]/1024**2:.2f}MB ... {max_malloc[n]/1024**2:.2f}MB"
+        f"{device_name} {n} ... {time_init[i]:.2f}s ... {time_composition[i]:.2f}s ... "
+        f"{time_compile[i]:.2f}s ... {time_sim[i]:.2f}s ... {time_total[i]:.2f}s ... "
+        f"{max_mem[i]/1024**2:.2f}MB ... {max_malloc[i]/1024**2:.2f}MB"
     )
 
-print("Summary")
-print("Qubits ... init time ... composition time ... compile ... simulate time ... total time ... RSS-peak ... malloc-peak")
-for n in range(1, max_qubits):
+print(f"Summary (median time, largest peak of {args.repeat} run(s))")
+print("Device ... Qubits ... init time ... composition time ... compile ... simulate time ... total time ... RSS-peak ... malloc-peak")
+for (d, device_name), n in ((dn, n) for dn in enumerate(device_names) for n in dims):
+    t = {name: np.median(a[d, n]) for name, a in (
+        ("init", time_init), ("composition", time_composition), ("compile", time_compile),
+        ("sim", time_sim), ("total", time_total),
+    )}
     print(
-        f"{n} ... {time_init[n]:.2f}s ... {time_composition[n]:.2f}s ... "
-        f"{time_compile[n]:.2f}s ... {time_sim[n]:.2f}s ... {time_total[n]:.2f}s ... "
-        f"{max_mem[n]/1024**2:.2f}MB ... {max_malloc[n]/1024**2:.2f}MB"
+        f"{device_name} ... {n} ... {t['init']:.2f}s ... {t['composition']:.2f}s ... "
+        f"{t['compile']:.2f}s ... {t['sim']:.2f}s ... {t['total']:.2f}s ... "
+        f"{max_mem[d, n].max()/1024**2:.2f}MB ... {max_malloc[d, n].max()/1024**2:.2f}MB"
     )
 
@@ -1,42 +1,24 @@
 
 # UPDATED QFT_bench_spy_gpu.py
-# Includes RAM + VRAM peak observer via psutil + NVML
+# Includes RAM + VRAM peak observer via VmHWM + NVML
 
 from qiskit import QuantumCircuit, transpile
 from qiskit_aer import AerSimulator
 from qiskit.circuit.library import QFTGate
 import numpy as np
-import time, threading, psutil, os, tracemalloc, cpuinfo
+import time, os, tracemalloc
+import sys
+from pathlib import Path
 
-# ---------- NVML (VRAM) ----------
-from pynvml import *
-nvmlInit()
-GPU_INDEX = int(os.environ.get("GPU_INDEX", 0))
-gpu_handle = nvmlDeviceGetHandleByIndex(GPU_INDEX)
-
-process = psutil.Process(os.getpid())
-
-peak_rss  = 0
-peak_vram = 0
-running   = True
-
-def poll_memory(interval=0.01):
-    global peak_rss
-    while running:
-        rss = process.memory_info().rss
-        peak_rss = max(peak_rss, rss)
-        time.sleep(interval)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from bench.environment import capture, describe
+from bench.memory import PeakMemory, PeakVram
+from bench.states import StateProvider
 
-def poll_vram(interval=0.01):
-    global peak_vram
-    while running:
-        mem = nvmlDeviceGetMemoryInfo(gpu_handle)
-        peak_vram = max(peak_vram, mem.used)
-        time.sleep(interval)
-
-def random_complex_unit_vector(n):
-    v = np.random.normal(size=n) + 1j*np.random.normal(size=n)
-    return v / np.linalg.norm(v)
+# ---------- RAM (VmHWM) + VRAM (NVML) ----------
+GPU_INDEX = int(os.environ.get("GPU_INDEX", 0))
+memory = PeakMemory()
+vram = PeakVram(GPU_INDEX)
 
 def print_aer_device(backend):
     print(f"Aer method={backend.options.method}, device={backend.options.device}, available={backend.available_devices()}")
@@ -55,29 +37,26 @@ max_vram  = np.zeros(max_qubits)
 max_malloc = np.zeros(max_qubits)
 
 backend = AerSimulator(method="statevector", device="GPU")
+states = StateProvider(seed=int(os.environ.get("QFT_SEED", 0)))
 
-info = cpuinfo.get_cpu_info()
-print(f"CPU: {info['brand_raw']} | Cores: {info['count']} | Arch: {info['arch']}")
+env = capture()
+print(f"Host: {describe(env)}")
 print_aer_device(backend)
 
 for n in range(min_qubits, max_qubits):
 
     tracemalloc.start()
 
-    peak_rss = peak_vram = 0
-    running = True
-
-    t_ram  = threading.Thread(target=poll_memory, daemon=True)
-    t_vram = threading.Thread(target=poll_vram, daemon=True)
-    t_ram.start()
-    t_vram.start()
+    memory.start()
+    vram.start()
 
     start = time.perf_counter()
-    psi0 = random_complex_unit_vector(2**n).astype(np.complex128)
+    psi0 = np.array(states.get(n), dtype=np.complex128)
     time_init[n] = time.perf_counter() - start
 
     start = time.perf_counter()
     qc = QuantumCircuit(n, n)
+    qc.set_statevector(psi0)
     qc.append(QFTGate(n), range(n))
     qc.measure(range(n), range(n))
     time_comp[n] = time.perf_counter() - start
@@ -87,16 +66,15 @@ for n in range(min_qubits, max_qubits):
     time_trans[n] = time.perf_counter() - start
 
     start = time.perf_counter()
-    backend.run(circ, shots=1024, initial_statevector=psi0).result()
+    backend.run(circ, shots=1024).result()
     time_sim[n] = time.perf_counter() - start
 
-    running = False
-    t_ram.join()
-    t_vram.join()
+    memory.stop()
+    vram.stop()
 
     time_total[n] = time_comp[n] + time_trans[n] + time_sim[n]
-    max_mem[n] = peak_rss
-    max_vram[n] = peak_vram
+    max_mem[n] = memory.peak_rss
+    max_vram[n] = vram.peak
 
     _, peak = tracemalloc.get_traced_memory()
     max_malloc[n] = peak
@@ -112,4 +90,4 @@ for n in range(1, max_qubits):
     print(f"{n} ... {time_total[n]:.2f}s ... {max_mem[n]/1024**2:.1f}MB RAM ... "
           f"{max_vram[n]/1024**2:.1f}MB VRAM")
 
-nvmlShutdown()
+vram.shutdown()
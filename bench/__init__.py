@@ -0,0 +1,21 @@
+"""
+Unified QFT benchmark runner.
+
+All frameworks (python_sim, Qiskit Aer, PennyLane) are wrapped as backends
+with the same prepare / build / compile / run phases and share the timing,
+memory measurement, result store and command line::
+
+    python -m bench list
+    python -m bench run -n 1:20 -b python_sim:SQFTS -b qiskit_aer -b pennylane:lightning.qubit
+"""
+
+from .backends import Backend, BACKENDS, register, create_backend, available_backends
+from .runner import run_benchmark, parse_dims
+from .states import StateProvider
+from .store import ResultStore
+
+__all__ = [
+    'Backend', 'BACKENDS', 'register', 'create_backend', 'available_backends',
+    'run_benchmark', 'parse_dims',
+    'StateProvider', 'ResultStore',
+]
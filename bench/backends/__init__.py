@@ -0,0 +1,92 @@
+"""
+Backend registry.
+
+Backends are referred to by spec strings of the form
+``name[:variant][,key=value,...]``, e.g. ``python_sim:SQFTS``,
+``qiskit_aer:GPU,readout=shots`` or ``pennylane:lightning.qubit``.
+Framework imports happen inside the backends, so listing or parsing
+specs never imports Qiskit or PennyLane.
+"""
+
+import itertools
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from .base import Backend, parse_value
+from .python_sim import PythonSimBackend
+from .qiskit_aer import QiskitAerBackend
+from .pennylane import PennyLaneBackend
+
+BACKENDS: Dict[str, Type[Backend]] = {}
+
+
+def register(cls: Type[Backend]) -> Type[Backend]:
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+for _cls in (PythonSimBackend, QiskitAerBackend, PennyLaneBackend):
+    register(_cls)
+
+
+def parse_spec(spec: str) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    head, *opts = spec.split(',')
+    name, _, variant = head.partition(':')
+    options = {}
+    for opt in opts:
+        key, sep, value = opt.partition('=')
+        if not sep:
+            raise ValueError(f'malformed backend option {opt!r} in {spec!r}')
+        options[key.strip()] = parse_value(value)
+    return name.strip(), (variant.strip() or None), options
+
+
+def create_backend(spec: str, **defaults: Any) -> Backend:
+    name, variant, options = parse_spec(spec)
+    if name not in BACKENDS:
+        raise ValueError(f'unknown backend {name!r} (choose from {", ".join(BACKENDS)})')
+    cls = BACKENDS[name]
+    if not cls.available():
+        raise RuntimeError(f'backend {name!r} needs: {", ".join(cls.requires)}')
+    return cls(variant=variant, **{**defaults, **options})
+
+
+def parse_sweep(text: str) -> Tuple[str, List[str]]:
+    """``"key=v1,v2,..."`` -> ``("key", ["v1", "v2", ...])``."""
+    key, sep, values = text.partition('=')
+    if not sep or not values:
+        raise ValueError(f'malformed sweep {text!r}, expected key=value[,value...]')
+    return key.strip(), [v.strip() for v in values.split(',')]
+
+
+def expand_sweeps(specs: Sequence[str], sweeps: Sequence[str]) -> List[str]:
+    """
+    One spec per point of the cartesian product of all ``sweeps`` that the
+    spec's backend declares in ``sweep_options``. Options already fixed in
+    the spec are not swept.
+    """
+    parsed = [parse_sweep(s) for s in sweeps]
+    expanded = []
+    for spec in specs:
+        name, _, options = parse_spec(spec)
+        cls = BACKENDS.get(name)
+        axes = [
+            [f'{key}={value}' for value in values]
+            for key, values in parsed
+            if cls is not None and key in cls.sweep_options and key not in options
+        ]
+        for point in itertools.product(*axes):
+            expanded.append(','.join((spec,) + point))
+    return expanded
+
+
+def available_backends() -> List[str]:
+    return [name for name, cls in BACKENDS.items() if cls.available()]
+
+
+__all__ = [
+    'Backend', 'BACKENDS', 'register',
+    'parse_spec', 'parse_sweep', 'expand_sweeps', 'create_backend', 'available_backends',
+    'PythonSimBackend', 'QiskitAerBackend', 'PennyLaneBackend',
+]
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,182 @@
+import importlib.util
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+
+def parse_value(raw: str) -> Any:
+    """Interpret a ``key=value`` option value from the command line."""
+    low = raw.strip().lower()
+    if low in ('true', 'yes', 'on'):
+        return True
+    if low in ('false', 'no', 'off'):
+        return False
+    if low in ('none', 'null'):
+        return None
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+class Backend:
+    """
+    Base class of all benchmark backends.
+
+    A backend is driven through four phases per dimension, each of which is
+    timed separately by the runner:
+
+    - ``prepare(dim, state)``: take over the (shared) input state
+    - ``build()``: construct the circuit / operator / QNode
+    - ``compile()``: transpile or compile, if the framework has such a step
+    - ``run()``: execute the transform and return the raw output
+
+    ``variant`` selects the engine / device / method inside a framework,
+    ``readout`` selects between returning the final statevector (``state``)
+    and sampling ``shots`` measurements (``shots``).
+
+    Backends with ``batched = True`` accept the option ``batch=K``: the
+    runner then hands ``prepare`` a ``(K, 2**dim)`` stack of input states and
+    ``run`` transforms all of them, so per-call overhead is amortised.
+    """
+
+    name: str = ''
+    description: str = ''
+    requires: Iterable[str] = ()
+    variants: Iterable[str] = ()
+    default_variant: Optional[str] = None
+    readouts: Iterable[str] = ('state',)
+    default_readout: str = 'state'
+    # options that --sweep may vary for this backend
+    sweep_options: Iterable[str] = ()
+    # largest acceptable L2 distance to the reference transform
+    atol: float = 1e-8
+    # whether prepare() accepts a (batch, 2**dim) stack of states
+    batched: bool = False
+
+    def __init__(
+        self,
+        variant: Optional[str] = None,
+        readout: Optional[str] = None,
+        shots: int = 1024,
+        max_dim: Optional[int] = None,
+        **options: Any
+    ):
+        self.variant = variant or self.default_variant
+        if self.variants and self.variant not in self.variants:
+            raise ValueError(
+                f'{self.name}: unknown variant {self.variant!r} '
+                f'(choose from {", ".join(self.variants)})'
+            )
+        self.readout = readout or self.default_readout
+        if self.readout not in self.readouts:
+            raise ValueError(
+                f'{self.name}: readout {self.readout!r} not supported '
+                f'(choose from {", ".join(self.readouts)})'
+            )
+        self.shots = int(shots)
+        self.max_dim = max_dim
+        self.options = options
+        if self.batch > 1 and not self.batched:
+            raise ValueError(f'{self.name}: batched runs are not supported')
+        self.dim: Optional[int] = None
+        self.state: Optional[np.ndarray] = None
+
+    @classmethod
+    def available(cls) -> bool:
+        return all(importlib.util.find_spec(mod) is not None for mod in cls.requires)
+
+    @property
+    def label(self) -> str:
+        label = self.name if self.variant is None else f'{self.name}:{self.variant}'
+        extra = {'readout': self.readout} if self.readout != self.default_readout else {}
+        if self.readout == 'shots':
+            # shots is a constructor argument, not an option, but changes the work done
+            extra['shots'] = self.shots
+        extra.update(self.options)
+        if extra:
+            label += ',' + ','.join(f'{k}={v}' for k, v in extra.items())
+        return label
+
+    @property
+    def batch(self) -> int:
+        """Number of input states transformed per run (option ``batch``)."""
+        return int(self.options.get('batch', 1))
+
+    @property
+    def cost_variant(self) -> Optional[str]:
+        """Key of the roofline cost model, if options change the work done."""
+        return self.variant
+
+    @property
+    def amplitude_bytes(self) -> int:
+        """Bytes per amplitude of the simulated state (for the roofline traffic)."""
+        return 16
+
+    def config(self) -> Dict[str, Any]:
+        """Everything that identifies this configuration in the result store."""
+        config = {'readout': self.readout, **self.options}
+        if self.readout == 'shots':
+            config['shots'] = self.shots
+        return config
+
+    def clone(self, **overrides: Any) -> 'Backend':
+        """A fresh backend with the same configuration, except ``overrides``."""
+        kwargs = dict(
+            variant=self.variant,
+            readout=self.readout,
+            shots=self.shots,
+            max_dim=self.max_dim,
+            **self.options
+        )
+        kwargs.update(overrides)
+        return type(self)(**kwargs)
+
+    def supports(self, dim: int) -> bool:
+        return self.max_dim is None or dim <= self.max_dim
+
+    ##############
+    ### Phases ###
+    ##############
+
+    def prepare(self, dim: int, state: np.ndarray) -> None:
+        self.dim = dim
+        self.state = state
+
+    def build(self) -> None:
+        pass
+
+    def compile(self) -> None:
+        pass
+
+    def run(self) -> Any:
+        raise NotImplementedError
+
+    def metrics(self) -> Dict[str, Any]:
+        """Backend specific measurements of the last run, stored with the record."""
+        return {}
+
+    def reset(self) -> None:
+        """Drop everything held for the current dimension."""
+        self.state = None
+
+    ##############
+    ### Output ###
+    ##############
+
+    def statevector(self, output: Any) -> Optional[np.ndarray]:
+        """
+        Final statevector in natural bit order, if the readout has one; a
+        ``(batch, 2**dim)`` stack for batched runs.
+        """
+        if self.readout != 'state':
+            return None
+        return np.asarray(output).reshape(-1)
+
+    def counts(self, output: Any) -> Optional[Dict[int, int]]:
+        """Measured outcome histogram (integer outcome -> count), if sampled."""
+        return None
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,95 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .base import Backend
+
+# devices of this process by (device name, wires, shots)
+_devices: Dict[Tuple[str, int, Optional[int]], Any] = {}
+
+
+def samples_to_counts(samples: np.ndarray) -> Dict[int, int]:
+    """
+    Histogram of ``(shots, wires)`` 0/1 samples, wire 0 being the most
+    significant bit: outcome -> count.
+    """
+    from python_sim.sampling import counts
+
+    samples = np.asarray(samples)
+    wires = samples.shape[1]
+    weights = 1 << np.arange(wires - 1, -1, -1, dtype=np.int64)
+    return counts(samples.astype(np.int64) @ weights, wires)
+
+
+def device(name: str, wires: int, shots: Optional[int] = None, reuse: bool = True) -> Any:
+    """``qml.device(name, wires=wires, shots=shots)``, created once per process if ``reuse``."""
+    import pennylane as qml
+
+    key = (name, wires, shots)
+    if not reuse:
+        return qml.device(name, wires=wires, shots=shots)
+    if key not in _devices:
+        _devices[key] = qml.device(name, wires=wires, shots=shots)
+    return _devices[key]
+
+
+class PennyLaneBackend(Backend):
+    """
+    ``qml.StatePrep`` followed by ``qml.QFT`` on a PennyLane device.
+
+    Devices are created once per (device, wires, shots) and reused by later
+    runs (``reuse_device=false`` creates a fresh one each time). The input
+    state is a QNode argument, and the QNode is built with
+    ``diff_method=None``: nothing is ever differentiated, so no gradient
+    bookkeeping is set up. ``readout=state`` returns ``qml.state()`` and
+    skips sampling altogether.
+    """
+
+    name = 'pennylane'
+    description = 'PennyLane qml.QFT on default / lightning devices'
+    requires = ('pennylane',)
+    variants = ('default.qubit', 'lightning.qubit', 'lightning.gpu')
+    default_variant = 'default.qubit'
+    readouts = ('shots', 'state')
+    default_readout = 'shots'
+    sweep_options = ('readout', 'shots', 'compile', 'reuse_device')
+
+    def prepare(self, dim: int, state: np.ndarray) -> None:
+        super().prepare(dim, state)
+        self.input = np.ascontiguousarray(state, dtype=np.complex128)
+
+    def build(self) -> None:
+        import pennylane as qml
+
+        wires = list(range(self.dim))
+        shots = self.shots if self.readout == 'shots' else None
+        dev = device(self.variant, self.dim, shots, self.options.get('reuse_device', True))
+
+        def circuit(psi0):
+            qml.StatePrep(psi0, wires=wires)
+            qml.QFT(wires=wires)
+            if self.readout == 'state':
+                return qml.state()
+            return qml.sample(wires=wires)
+
+        self.qnode = qml.QNode(circuit, dev, diff_method=None)
+
+    def compile(self) -> None:
+        import pennylane as qml
+
+        if self.options.get('compile', True):
+            self.qnode = qml.compile(self.qnode)
+
+    def run(self) -> Any:
+        return self.qnode(self.input)
+
+    def counts(self, output: Any) -> Optional[Dict[int, int]]:
+        if self.readout != 'shots':
+            return None
+        return samples_to_counts(output)
+
+    def reset(self) -> None:
+        super().reset()
+        self.input = self.qnode = None
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,166 @@
+import functools
+import importlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .base import Backend
+
+# engine name -> module inside python_sim
+ENGINES = {
+    'QFT': 'qft',
+    'SQFT': 'qft',
+    'QFTS': 'qft_sparse',
+    'SQFTS': 'qft_sparse',
+    'QFTN': 'qft_numba',
+    'SQFTN': 'qft_numba',
+    'SQFTV': 'qft_vec',
+    'SQFTR': 'qft_vec',
+    'SQFTD': 'distributed',
+}
+
+# engines that can apply their layers as KronOperators (option factored)
+FACTORED = ('QFT', 'SQFT', 'QFTS', 'SQFTS')
+SPARSE = ('QFTS', 'SQFTS')
+
+
+class PythonSimBackend(Backend):
+    """
+    The numpy / scipy engines of ``python_sim`` (one engine per variant).
+    The engines return the transform in swapped bit order. A batch of
+    states is transformed as one ``(2**dim, batch)`` matrix, so each stage
+    is a single matrix-matrix product.
+
+    With the option ``phases=true`` the run is profiled with
+    ``python_sim.instrument`` and the per-phase breakdown (operator
+    construction, gate application) is stored in the record.
+
+    ``factored=true`` makes QFT / SQFT / QFTS / SQFTS apply every layer as a
+    ``KronOperator`` (factor-wise contraction, O(2^n) memory) instead of a
+    materialised matrix.
+
+    ``format`` picks the layer storage of QFTS / SQFTS: ``auto`` (default:
+    DIA for diagonal layers, PermScale for H layers) or ``csr``.
+
+    ``SQFTR`` is SQFTV with log2(``radix``) qubits per pass over the state
+    (``radix`` 2, 4 or 8, default 4).
+
+    ``SQFTD`` runs SQFTV on ``ranks`` local processes (default 4) that
+    exchange data over ``transport`` (pipe, shm or socket); the slowest
+    rank's compute and communication times are stored as ``compute_s`` and
+    ``comm_s``.
+
+    ``readout=shots`` draws ``shots`` samples from the result inside the
+    timed run with ``python_sim.sampling`` (chunked, no second full-size
+    array), like the sampling Qiskit and PennyLane runs do; the outcomes are
+    bit-reversed instead of the state. ``shot_seed`` seeds the draws.
+    """
+
+    name = 'python_sim'
+    description = 'python_sim dense / sparse / numba engines'
+    requires = ('numpy', 'scipy')
+    variants = tuple(ENGINES)
+    default_variant = 'SQFT'
+    readouts = ('state', 'shots')
+    sweep_options = ('readout', 'shots', 'batch', 'factored', 'radix', 'format')
+    batched = True
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        if 'format' in self.options:
+            from python_sim.qft_sparse import check_format
+
+            check_format(self.options['format'])
+
+    @property
+    def cost_variant(self) -> Optional[str]:
+        if self.options.get('factored') and self.variant in FACTORED:
+            return f'{self.variant},factored'
+        if self.options.get('format', 'auto') != 'auto' and self.variant in SPARSE:
+            return f'{self.variant},{self.options["format"]}'
+        if self.variant == 'SQFTR':
+            return f'SQFTR,radix={int(self.options.get("radix", 4))}'
+        return self.variant
+
+    def supports(self, dim: int) -> bool:
+        if self.variant == 'SQFTD':
+            from python_sim.distributed import DEFAULT_RANKS, min_dim
+
+            # too few qubits for the all-to-all transpose of this many ranks
+            if dim < min_dim(int(self.options.get('ranks', DEFAULT_RANKS))):
+                return False
+        return super().supports(dim)
+
+    def prepare(self, dim: int, state: np.ndarray) -> None:
+        super().prepare(dim, state)
+        self.input = np.array(state, dtype=complex)
+        if self.input.ndim == 2:
+            # one state per column
+            self.input = np.ascontiguousarray(self.input.T)
+
+    def build(self) -> None:
+        module = importlib.import_module(f'python_sim.{ENGINES[self.variant]}')
+        self.engine = getattr(module, self.variant)
+        self.rank_stats = []
+        if self.options.get('factored') and self.variant in FACTORED:
+            self.engine = functools.partial(self.engine, factored=True)
+        elif self.options.get('format') and self.variant in SPARSE:
+            self.engine = functools.partial(self.engine, format=self.options['format'])
+        if self.variant == 'SQFTR':
+            self.engine = functools.partial(self.engine, radix=int(self.options.get('radix', 4)))
+        if self.variant == 'SQFTD':
+            self.engine = functools.partial(
+                self.engine,
+                ranks=self.options.get('ranks', module.DEFAULT_RANKS),
+                transport=self.options.get('transport', 'pipe'),
+                stats=self.rank_stats,
+            )
+
+    def run(self) -> Any:
+        from python_sim.instrument import profiled
+
+        with profiled(self.options.get('phases', False)) as self.profile:
+            output = self.engine(self.input)
+        if self.readout == 'state':
+            return output
+        from python_sim.sampling import reverse_bits, sample
+
+        rng = np.random.default_rng(self.options.get('shot_seed'))
+        columns = output.reshape(len(output), -1).T
+        # one row of outcomes per input state
+        return np.stack([reverse_bits(sample(c, self.shots, rng), self.dim) for c in columns])
+
+    def metrics(self) -> Dict[str, Any]:
+        metrics: Dict[str, Any] = {}
+        profile = getattr(self, 'profile', None)
+        if profile is not None:
+            metrics['phases'] = profile.as_dict()
+        stats = getattr(self, 'rank_stats', None)
+        if stats:
+            metrics['compute_s'] = max(s['compute_s'] for s in stats)
+            metrics['comm_s'] = max(s['comm_s'] for s in stats)
+            metrics['bytes_sent'] = sum(s['bytes_sent'] for s in stats)
+        return metrics
+
+    def statevector(self, output: Any) -> Optional[np.ndarray]:
+        from python_sim.qft import bit_reverse
+
+        if self.readout != 'state':
+            return None
+        output = np.asarray(output)
+        if output.ndim == 2 and output.shape[1] > 1:
+            return bit_reverse(output).T
+        return bit_reverse(output.reshape(-1))
+
+    def counts(self, output: Any, index: int = 0) -> Optional[Dict[int, int]]:
+        from python_sim.sampling import counts
+
+        if self.readout != 'shots':
+            return None
+        return counts(output[index], self.dim)
+
+    def reset(self) -> None:
+        super().reset()
+        self.input = self.profile = self.rank_stats = None
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,427 @@
+import argparse
+import json
+import platform
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from .backends import BACKENDS, create_backend, expand_sweeps
+from .compare import VERDICTS, compare, format_comparisons, latest_runs
+from .environment import capture, describe
+from .importtime import DEFAULT_MODULES, measure_import
+from .roofline import stream
+from .runner import parse_dims, run_benchmark, summary_table
+from .scaling import MEMORY_FIELD, MODELS, TIME_FIELD, fit_records, prediction_table
+from .spmv import LAYERS, measure_spmv
+from .states import StateProvider
+from .store import ResultStore
+from .verify import reference, verify
+
+DEFAULT_STORE = 'results/bench.jsonl'
+
+
+def cmd_list(args: argparse.Namespace) -> int:
+    for name, cls in BACKENDS.items():
+        status = 'available' if cls.available() else f'missing {", ".join(cls.requires)}'
+        print(f'{name:<12} {cls.description} [{status}]')
+        print(f'{"":<12} variants: {", ".join(cls.variants)}; readouts: {", ".join(cls.readouts)}')
+        if cls.sweep_options:
+            print(f'{"":<12} sweepable: {", ".join(cls.sweep_options)}')
+    return 0
+
+
+def measure_stream(store: ResultStore, size: int) -> dict:
+    print(f'STREAM probe on {size * 8 / 1024**2:.0f} MiB arrays ...', flush=True)
+    record = {'kind': 'stream', 'timestamp': time.time(), 'host': platform.node()}
+    record.update(stream(size))
+    store.append(record)
+    print(' ... '.join(
+        f"{k[:-5]} {v:.1f} GB/s" for k, v in record.items() if k.endswith('_gbps')
+    ))
+    return record
+
+
+def cmd_stream(args: argparse.Namespace) -> int:
+    measure_stream(ResultStore(args.output), args.size)
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    specs = expand_sweeps(args.backend or ['python_sim'], args.sweep or [])
+    backends = [create_backend(spec, shots=args.shots) for spec in specs]
+    store = ResultStore(args.output)
+    host = measure_stream(store, args.stream_size) if args.stream else None
+    max_memory = args.max_memory * 1024**2 if args.max_memory is not None else None
+    history = []
+    if args.max_time is not None or max_memory is not None:
+        history = list(store.records(host=platform.node(), status='ok'))
+    environment = capture()
+    print(describe(environment), flush=True)
+    records = []
+    try:
+        run_benchmark(
+            backends,
+            parse_dims(args.dims),
+            store=store,
+            repeat=args.repeat,
+            states=StateProvider(args.seed, args.state_dir, cache=not args.no_state_cache),
+            trace_malloc=args.tracemalloc,
+            timeline=args.timeline,
+            records=records,
+            verify=args.verify,
+            atol=args.atol,
+            max_time=args.max_time,
+            max_memory=max_memory,
+            history=history,
+            environment=environment,
+        )
+    except KeyboardInterrupt:
+        pass
+
+    print()
+    print('--------------')
+    print('---  Time  ---')
+    print('--------------')
+    print(summary_table(records, 'time_total'))
+    print()
+    print('--------------')
+    print('- Memory MB --')
+    print('--------------')
+    print(summary_table(records, 'peak_rss', scale=1024**2))
+    if any(r.get('batch', 1) > 1 for r in records):
+        print()
+        print('--------------')
+        print('- Run ms/state')
+        print('--------------')
+        print(summary_table(records, 'time_run_per_state', scale=1e-3))
+    if any('gbps' in r for r in records):
+        print()
+        print('--------------')
+        print('-- Run GB/s --')
+        print('--------------')
+        print(summary_table(records, 'gbps'))
+        print()
+        print('--------------')
+        print('- Run GFLOP/s ')
+        print('--------------')
+        print(summary_table(records, 'gflops'))
+        if host is not None:
+            best = max(r.get('gbps', 0) for r in records)
+            print(f"\nbest {best:.2f} GB/s = {100 * best / host['triad_gbps']:.1f}% of STREAM triad")
+    if args.sweep:
+        print()
+        print('--------------')
+        print('-- Fastest ---')
+        print('--------------')
+        print(fastest_table(records))
+    print(f'\nresults appended to {store.path}')
+
+    wrong = sorted({r['label'] for r in records if r['status'] == 'incorrect'})
+    if wrong:
+        print(f'verification FAILED for: {", ".join(wrong)}')
+        return 1
+    return 0
+
+
+def cmd_verify(args: argparse.Namespace) -> int:
+    backends = [create_backend(spec) for spec in (args.backend or ['python_sim'])]
+    states = StateProvider(args.seed, args.state_dir, cache=not args.no_state_cache)
+    failed = set()
+    for dim in parse_dims(args.dims):
+        state = states.get(dim)
+        expected = reference(state)
+        for backend in backends:
+            if backend.label in failed or not backend.supports(dim):
+                continue
+            check = verify(backend, dim, state, expected, args.atol)
+            print(check, flush=True)
+            if not check.ok:
+                failed.add(backend.label)
+    if failed:
+        print(f'verification FAILED for: {", ".join(sorted(failed))}')
+        return 1
+    return 0
+
+
+def cmd_importtime(args: argparse.Namespace) -> int:
+    store = ResultStore(args.output) if args.output else None
+    slow = []
+    for module in args.module or DEFAULT_MODULES:
+        record = measure_import(module, args.repeat)
+        record.update(timestamp=time.time(), host=platform.node())
+        if store is not None:
+            store.append(record)
+        slowest = ', '.join(f'{name} {ms:.1f}ms' for name, ms in record['slowest'])
+        print(f"{module:<24} {record['import_ms']:>9.1f}ms ... {record['modules_loaded']} modules ... {slowest}")
+        if args.max_ms is not None and record['import_ms'] > args.max_ms:
+            slow.append(module)
+    if slow:
+        print(f'import time above {args.max_ms}ms for: {", ".join(slow)}')
+        return 1
+    return 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    filters = {'host': args.host} if args.host else {}
+    baseline = list(ResultStore(args.baseline).records(**filters))
+    if args.candidate is None:
+        # one store: by default the last run against the one before it
+        candidate = baseline
+        runs = latest_runs(baseline)
+        candidate_run = args.candidate_run or (runs[-1] if runs else None)
+        baseline_run = args.baseline_run or next((r for r in reversed(runs) if r != candidate_run), None)
+        if baseline_run is None or candidate_run is None:
+            print(f'{args.baseline} holds fewer than two runs; give a candidate store or run ids')
+            return 2
+    else:
+        candidate = list(ResultStore(args.candidate).records(**filters))
+        baseline_run, candidate_run = args.baseline_run, args.candidate_run
+    if baseline_run is not None:
+        baseline = [r for r in baseline if r.get('run_id') == baseline_run]
+    if candidate_run is not None:
+        candidate = [r for r in candidate if r.get('run_id') == candidate_run]
+    print(f'baseline:  {args.baseline}' + (f' run {baseline_run}' if baseline_run else ''))
+    print(f'candidate: {args.candidate or args.baseline}' + (f' run {candidate_run}' if candidate_run else ''))
+
+    envs = [{r['env_id'] for r in records if 'env_id' in r} for records in (baseline, candidate)]
+    if envs[0] and envs[1] and envs[0] != envs[1]:
+        print(f'warning: different environments ({", ".join(sorted(envs[0]))} vs {", ".join(sorted(envs[1]))}),'
+              ' see python -m bench env')
+
+    comparisons = compare(
+        baseline, candidate, args.field, args.threshold, args.alpha, args.label, args.allow_insufficient,
+    )
+    if not comparisons:
+        print('no (label, dim) measured in both result sets')
+        return 2
+    print(format_comparisons(comparisons))
+    counts = {v: sum(c.verdict == v for c in comparisons) for v in VERDICTS}
+    print('\n' + ', '.join(f'{n} {v}' for v, n in counts.items() if n))
+    if any(not c.tested and c.verdict != 'insufficient' for c in comparisons):
+        print('pairs with a single repetition were judged on the ratio alone (--allow-insufficient)')
+    regressions = [c for c in comparisons if c.verdict == 'regression']
+    if regressions:
+        print(f'REGRESSION (> {100 * args.threshold:.0f}% slower, p < {args.alpha}) for: ' + ', '.join(
+            f'{c.label} n={c.dim}' for c in regressions
+        ))
+        return 1
+    insufficient = [c for c in comparisons if c.verdict == 'insufficient']
+    if insufficient:
+        print(f'{len(insufficient)} pair(s) have fewer than 2 repetitions on a side and cannot be tested; '
+              'rerun with -r 2 or more, or pass --allow-insufficient to judge them on the ratio alone')
+        return 2
+    return 0
+
+
+def cmd_env(args: argparse.Namespace) -> int:
+    if args.input:
+        found = [r for r in ResultStore(args.input).records(kind='environment')
+                 if args.env_id is None or r['env_id'] == args.env_id]
+        if not found:
+            print(f'no environment records in {args.input}')
+            return 1
+        for info in {r['env_id']: r for r in found}.values():
+            print(json.dumps(info, indent=1) if args.json else describe(info))
+        return 0
+    info = capture(refresh=args.refresh)
+    print(json.dumps(info, indent=1) if args.json else describe(info))
+    return 0
+
+
+def cmd_spmv(args: argparse.Namespace) -> int:
+    store = ResultStore(args.output) if args.output else None
+    threads = [int(t) for t in args.threads.split(',')] if args.threads else None
+    print(f'{"LAYER":<10} {"DIM":>4} {"THREADS":>8} {"TIME":>12} {"GB/s":>8} {"SPEEDUP":>8}')
+    for kind in args.layer or LAYERS:
+        for dim in parse_dims(args.dims):
+            for record in measure_spmv(kind, dim, threads, args.repeat):
+                record.update(timestamp=time.time(), host=platform.node())
+                if store is not None:
+                    store.append(record)
+                print(
+                    f"{kind:<10} {dim:>4} {record['threads']:>8} {record['time_s']:>11.6f}s"
+                    f" {record['gbps']:>8.2f} {record['speedup']:>7.2f}x"
+                )
+    return 0
+
+
+def cmd_predict(args: argparse.Namespace) -> int:
+    filters = {'host': args.host} if args.host else {}
+    records = list(ResultStore(args.input).records(**filters))
+    in_mb = [
+        {**r, MEMORY_FIELD: r[MEMORY_FIELD] / 1024**2}
+        for r in records if r.get(MEMORY_FIELD) is not None
+    ]
+    fits = {
+        f'{TIME_FIELD} [s]': fit_records(records, TIME_FIELD, args.label, args.model, args.window),
+        f'{MEMORY_FIELD} [MB]': fit_records(in_mb, MEMORY_FIELD, args.label, args.model, args.window, offset=True),
+    }
+    if not any(fits.values()):
+        print('not enough measured dimensions to fit')
+        return 1
+    for metric, by_label in fits.items():
+        for lab, f in sorted(by_label.items()):
+            print(f'{metric:<16} {lab:<32} {f.describe()}')
+    print()
+    print(prediction_table(fits, parse_dims(args.dims), args.level))
+    return 0
+
+
+def fastest_table(records: list) -> str:
+    """Per backend and dimension, the configuration with the lowest median run time per state."""
+    runs = {}
+    for r in records:
+        if r['status'] == 'ok':
+            runs.setdefault((r['backend'], r['dim'], r['label']), []).append(r.get('time_run_per_state', r['time_run']))
+    best = {}
+    for (backend, dim, label), times in runs.items():
+        t = float(np.median(times))
+        if (backend, dim) not in best or t < best[backend, dim][1]:
+            best[backend, dim] = (label, t)
+    return '\n'.join(
+        f'{dim:<4} {t:>12.6g}s  {label}'
+        for (backend, dim), (label, t) in sorted(best.items())
+    )
+
+
+def add_state_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument('--seed', type=int, default=0,
+        help='seed of the random input states (default: 0)')
+    p.add_argument('--state-dir', default=None,
+        help='input state cache (default: $QFT_STATE_DIR or results/states)')
+    p.add_argument('--no-state-cache', action='store_true',
+        help='generate input states in memory instead of using the cache')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m bench', description='QFT benchmark runner')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help='list backends and their availability')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('run', help='benchmark backends over a range of dimensions')
+    p.add_argument('-b', '--backend', action='append',
+        help='backend spec name[:variant][,key=value,...]; repeatable')
+    p.add_argument('-n', '--dims', required=True,
+        help='dimensions (qubits): "1:20", "4,8,12" or "20"')
+    p.add_argument('-s', '--sweep', action='append',
+        help='key=v1,v2,... run every backend that can sweep key once per value; '
+             'several sweeps form a cartesian product')
+    p.add_argument('-r', '--repeat', type=int, default=1,
+        help='repetitions per backend and dimension')
+    p.add_argument('-o', '--output', default=DEFAULT_STORE,
+        help=f'result store to append to (default: {DEFAULT_STORE})')
+    add_state_args(p)
+    p.add_argument('--shots', type=int, default=1024,
+        help='shots for backends with a sampling readout')
+    p.add_argument('--tracemalloc', action='store_true',
+        help='additionally record the tracemalloc peak')
+    p.add_argument('--timeline', type=float, default=None, metavar='SECONDS',
+        help='also store an RSS-over-time curve sampled at this interval')
+    p.add_argument('--stream', action='store_true',
+        help='measure the host memory bandwidth (STREAM) before the run')
+    p.add_argument('--stream-size', type=int, default=1 << 25,
+        help='STREAM array length in float64 elements (default: 2^25)')
+    p.add_argument('--verify', action='store_true',
+        help='check every backend against the FFT reference before timing it')
+    p.add_argument('--max-time', type=float, default=None, metavar='SECONDS',
+        help='skip dims whose extrapolated total time exceeds this (see predict)')
+    p.add_argument('--max-memory', type=float, default=None, metavar='MB',
+        help='skip dims whose extrapolated peak RSS exceeds this')
+    p.add_argument('--atol', type=float, default=None,
+        help='accepted L2 error of --verify (default: per backend, 1e-8)')
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('stream', help='measure the host memory bandwidth (STREAM-like)')
+    p.add_argument('-o', '--output', default=DEFAULT_STORE,
+        help=f'result store to append to (default: {DEFAULT_STORE})')
+    p.add_argument('--size', type=int, default=1 << 25,
+        help='array length in float64 elements (default: 2^25)')
+    p.set_defaults(func=cmd_stream)
+
+    p = sub.add_parser('verify', help='only check backends against the FFT reference')
+    p.add_argument('-b', '--backend', action='append',
+        help='backend spec name[:variant][,key=value,...]; repeatable')
+    p.add_argument('-n', '--dims', required=True,
+        help='dimensions (qubits): "1:20", "4,8,12" or "20"')
+    add_state_args(p)
+    p.add_argument('--atol', type=float, default=None,
+        help='accepted L2 error (default: per backend, 1e-8)')
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser('importtime', help='measure module import times (-X importtime)')
+    p.add_argument('-m', '--module', action='append',
+        help=f'module to import; repeatable (default: {", ".join(DEFAULT_MODULES)})')
+    p.add_argument('-r', '--repeat', type=int, default=5,
+        help='fresh interpreters per module, the fastest counts (default: 5)')
+    p.add_argument('-o', '--output', default=None,
+        help='result store to append the records to')
+    p.add_argument('--max-ms', type=float, default=None,
+        help='exit with 1 if a module takes longer to import')
+    p.set_defaults(func=cmd_importtime)
+
+    p = sub.add_parser('predict', help='fit runtime / memory scaling laws and extrapolate')
+    p.add_argument('-n', '--dims', required=True,
+        help='dimensions to predict: "16:34", "20,30" or "33"')
+    p.add_argument('-i', '--input', default=DEFAULT_STORE,
+        help='result store to fit (default: results/bench.jsonl)')
+    p.add_argument('--host', default=None, help='only records of this host')
+    p.add_argument('--label', default=None, help='only labels matching this regular expression')
+    p.add_argument('--model', default='best', choices=('best',) + MODELS,
+        help='a*b^n (exp), a*n*2^n (nexp) or the one with the lower AIC (default)')
+    p.add_argument('--window', type=int, default=6,
+        help='fit the largest WINDOW measured dims (default: 6)')
+    p.add_argument('--level', type=float, default=0.95,
+        help='confidence level of the intervals (default: 0.95)')
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser('compare', help='test a candidate result set against a baseline for regressions')
+    p.add_argument('baseline', help='result store of the baseline')
+    p.add_argument('candidate', nargs='?', default=None,
+        help='result store of the candidate (default: the baseline store; then the last run '
+             'is compared with the run before it)')
+    p.add_argument('--baseline-run', default=None, help='only this run id of the baseline store')
+    p.add_argument('--candidate-run', default=None, help='only this run id of the candidate store')
+    p.add_argument('--field', default='time_run',
+        help='timing field to compare (default: time_run)')
+    p.add_argument('--host', default=None, help='only records of this host')
+    p.add_argument('--label', default=None, help='only labels matching this regular expression')
+    p.add_argument('--threshold', type=float, default=0.05,
+        help='relative slowdown that counts as a regression (default: 0.05)')
+    p.add_argument('--alpha', type=float, default=0.05,
+        help='significance level of the test (default: 0.05)')
+    p.add_argument('--allow-insufficient', action='store_true',
+        help='judge pairs with a single repetition on the ratio alone instead of failing')
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser('spmv', help='thread scaling of the parallel sparse matvec')
+    p.add_argument('-n', '--dims', required=True,
+        help='dimensions (qubits): "16:24", "20,24" or "22"')
+    p.add_argument('-t', '--threads', default=None,
+        help='comma separated thread counts (default: 1, 2, 4, ... up to the core count)')
+    p.add_argument('-l', '--layer', action='append', choices=LAYERS,
+        help=f'layer kind; repeatable (default: {", ".join(LAYERS)})')
+    p.add_argument('-r', '--repeat', type=int, default=5,
+        help='products per thread count, the fastest counts (default: 5)')
+    p.add_argument('-o', '--output', default=None,
+        help='result store to append the records to')
+    p.set_defaults(func=cmd_spmv)
+
+    p = sub.add_parser('env', help='show the host environment stored with the results')
+    p.add_argument('-i', '--input', default=None,
+        help='list the environments recorded in this result store instead')
+    p.add_argument('--env-id', default=None, help='only this environment of --input')
+    p.add_argument('--json', action='store_true', help='print the full record')
+    p.add_argument('--refresh', action='store_true',
+        help='re-read the hardware instead of using the per-boot cache')
+    p.set_defaults(func=cmd_env)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,158 @@
+"""
+Regression check between two result sets.
+
+For every (label, dim) measured in both sets the repeated timings are
+compared with Welch's t-test on log times, i.e. on the ratio
+candidate / baseline, which does not assume equal scatter and treats a 10%
+change the same at every size. The ratio is that of the geometric means
+(the exponential of the difference of the mean log times). A pair is a
+``regression`` when this ratio exceeds ``1 + threshold`` and the difference
+is significant at ``alpha``; an ``improvement`` likewise below
+``1 - threshold``. Pairs with fewer than two repetitions on a side cannot
+be tested and are reported as ``insufficient``, unless ``ratio_only`` is
+set: then they are judged on the ratio alone (``tested`` is False).
+
+A result set is the records of a store, optionally restricted to one run
+id; ``latest_runs`` picks the last two runs of a store for the common case
+of comparing the previous run with the current one.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scaling import t_quantile
+
+DEFAULT_FIELD = 'time_run'
+DEFAULT_THRESHOLD = 0.05
+DEFAULT_ALPHA = 0.05
+
+VERDICTS = ('regression', 'improvement', 'unchanged', 'insufficient')
+
+
+@dataclass
+class Comparison:
+    label: str
+    dim: int
+    n_baseline: int
+    n_candidate: int
+    baseline: float         # median
+    candidate: float        # median
+    ratio: float            # candidate / baseline, from the mean log times
+    lo: float               # confidence interval of the ratio
+    hi: float
+    p_value: Optional[float]
+    verdict: str
+    tested: bool = True     # False: judged on the ratio alone
+
+
+def t_sf(t: float, dof: float) -> float:
+    """Upper tail of Student's t (normal without scipy)."""
+    try:
+        from scipy.stats import t as student
+    except ImportError:
+        return 1 - NormalDist().cdf(t)
+    return float(student.sf(t, dof))
+
+
+def welch(a: Sequence[float], b: Sequence[float]) -> Tuple[float, float, float, float]:
+    """(mean(b) - mean(a), its standard error, Welch dof, two-sided p)."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    va, vb = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    diff = float(b.mean() - a.mean())
+    se = math.sqrt(va + vb)
+    if se == 0:
+        return diff, 0.0, float(len(a) + len(b) - 2), 0.0 if diff else 1.0
+    dof = (va + vb) ** 2 / (va**2 / (len(a) - 1) + vb**2 / (len(b) - 1))
+    return diff, se, dof, min(1.0, 2 * t_sf(abs(diff) / se, dof))
+
+
+def timings(
+    records: Iterable[Dict[str, Any]],
+    field: str = DEFAULT_FIELD,
+    label: Optional[str] = None,
+) -> Dict[Tuple[str, int], List[float]]:
+    """Values of ``field`` per (label, dim) of the ok records (label as a regex filter)."""
+    pattern = re.compile(label) if label else None
+    result: Dict[Tuple[str, int], List[float]] = {}
+    for r in records:
+        if r.get('status') != 'ok' or r.get(field) is None:
+            continue
+        if pattern is not None and not pattern.search(r['label']):
+            continue
+        result.setdefault((r['label'], r['dim']), []).append(float(r[field]))
+    return result
+
+
+def compare(
+    baseline: Iterable[Dict[str, Any]],
+    candidate: Iterable[Dict[str, Any]],
+    field: str = DEFAULT_FIELD,
+    threshold: float = DEFAULT_THRESHOLD,
+    alpha: float = DEFAULT_ALPHA,
+    label: Optional[str] = None,
+    ratio_only: bool = False,
+) -> List[Comparison]:
+    base = timings(baseline, field, label)
+    cand = timings(candidate, field, label)
+    result = []
+    for key in sorted(base.keys() & cand.keys()):
+        a, b = base[key], cand[key]
+        if min(a) <= 0 or min(b) <= 0:
+            continue
+        medians = float(np.median(a)), float(np.median(b))
+        if len(a) < 2 or len(b) < 2:
+            ratio = math.exp(float(np.mean(np.log(b)) - np.mean(np.log(a))))
+            verdict = 'insufficient'
+            if ratio_only:
+                verdict = 'regression' if ratio > 1 + threshold else \
+                    'improvement' if ratio < 1 - threshold else 'unchanged'
+            result.append(Comparison(
+                *key, len(a), len(b), *medians, ratio, math.nan, math.nan, None, verdict, False,
+            ))
+            continue
+        diff, se, dof, p = welch(np.log(a), np.log(b))
+        t = t_quantile(1 - alpha, dof) if se else 0.0
+        ratio = math.exp(diff)
+        verdict = 'unchanged'
+        if p < alpha and ratio > 1 + threshold:
+            verdict = 'regression'
+        elif p < alpha and ratio < 1 - threshold:
+            verdict = 'improvement'
+        result.append(Comparison(
+            *key, len(a), len(b), *medians, ratio,
+            math.exp(diff - t * se), math.exp(diff + t * se), p, verdict,
+        ))
+    return result
+
+
+def latest_runs(records: Iterable[Dict[str, Any]]) -> List[str]:
+    """Run ids ordered by their first record's timestamp."""
+    first: Dict[str, float] = {}
+    for r in records:
+        run = r.get('run_id')
+        if run is not None:
+            first[run] = min(first.get(run, math.inf), r.get('timestamp', 0))
+    return sorted(first, key=first.get)
+
+
+def format_comparisons(comparisons: Sequence[Comparison]) -> str:
+    rows = [
+        f'{"LABEL":<32} {"DIM":>4} {"N":>5} {"BASELINE":>12} {"CANDIDATE":>12}'
+        f' {"RATIO":>7} {"CI":>17} {"P":>8}  VERDICT'
+    ]
+    for c in comparisons:
+        ci = '' if math.isnan(c.lo) else f'[{c.lo:.3f}, {c.hi:.3f}]'
+        p = '' if c.p_value is None else f'{c.p_value:.2g}'
+        rows.append(
+            f'{c.label:<32} {c.dim:>4} {f"{c.n_baseline}/{c.n_candidate}":>5}'
+            f' {c.baseline:>11.6g}s {c.candidate:>11.6g}s {c.ratio:>7.3f} {ci:>17} {p:>8}  {c.verdict}'
+            + ('' if c.tested or c.verdict == 'insufficient' else ' (ratio only)')
+        )
+    return '\n'.join(rows)
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,268 @@
+"""
+Host and software fingerprint stored with the results.
+
+``capture()`` describes the machine a run happened on: CPU model, cores,
+SIMD flags, cache sizes, NUMA layout, memory, the BLAS in use and its
+thread count, thread-related environment variables, CPU frequency
+governors and the versions of the libraries involved. The runner stores it
+once per run as a ``kind=environment`` record and tags every result with
+its ``env_id``, so numbers from different machines or library versions are
+never mixed up silently.
+
+The hardware part does not change while the machine is up, and
+``cpuinfo.get_cpu_info()`` (used when py-cpuinfo is installed) takes about
+a second, so it is cached in ``$QFT_ENV_DIR`` (default results/environment)
+per host and boot id. Everything else is read from /proc, /sys and package
+metadata, which takes milliseconds.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import re
+import sys
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_ENV_DIR = Path(__file__).resolve().parent.parent / 'results' / 'environment'
+
+PACKAGES = (
+    'numpy', 'scipy', 'qiskit', 'qiskit-aer', 'qiskit-aer-gpu', 'pennylane',
+    'pennylane-lightning', 'pennylane-lightning-gpu', 'numba', 'threadpoolctl',
+)
+
+THREAD_VARS = (
+    'OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+    'NUMBA_NUM_THREADS', 'PYTHON_SIM_THREADS',
+)
+
+SIMD_FLAGS = ('sse4_2', 'avx', 'avx2', 'fma', 'avx512f', 'avx512vl', 'neon', 'asimd', 'sve')
+
+_SYS_CPU = Path('/sys/devices/system/cpu')
+_SYS_NODE = Path('/sys/devices/system/node')
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def _proc_cpuinfo() -> List[Dict[str, str]]:
+    text = _read(Path('/proc/cpuinfo')) or ''
+    blocks = []
+    for block in text.split('\n\n'):
+        entry = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition(':')
+            if sep:
+                entry[key.strip()] = value.strip()
+        if entry:
+            blocks.append(entry)
+    return blocks
+
+
+def _size_bytes(text: str) -> Optional[int]:
+    m = re.fullmatch(r'(\d+)\s*([KMG]?)', text or '')
+    if not m:
+        return None
+    return int(m.group(1)) * {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3}[m.group(2)]
+
+
+################
+### Hardware ###
+################
+
+def cpu() -> Dict[str, Any]:
+    procs = _proc_cpuinfo()
+    first = procs[0] if procs else {}
+    cores = {(p.get('physical id'), p.get('core id')) for p in procs if 'core id' in p}
+    flags = set((first.get('flags') or first.get('Features') or '').split())
+    info = {
+        'model': first.get('model name') or platform.processor() or None,
+        'vendor': first.get('vendor_id'),
+        'arch': platform.machine(),
+        'logical_cores': os.cpu_count(),
+        'physical_cores': len(cores) or None,
+        'sockets': len({p.get('physical id') for p in procs if 'physical id' in p}) or None,
+        'simd': sorted(flags & set(SIMD_FLAGS)),
+    }
+    try:
+        import cpuinfo
+    except ImportError:
+        return info
+    details = cpuinfo.get_cpu_info()
+    info['model'] = details.get('brand_raw') or info['model']
+    info['vendor'] = details.get('vendor_id_raw') or info['vendor']
+    info['hz_advertised'] = details.get('hz_advertised_friendly')
+    info['simd'] = sorted(set(info['simd']) | (set(details.get('flags', [])) & set(SIMD_FLAGS)))
+    return info
+
+
+def caches() -> List[Dict[str, Any]]:
+    """The caches of cpu0 (level, type, size, CPUs sharing it)."""
+    result = []
+    for index in sorted((_SYS_CPU / 'cpu0' / 'cache').glob('index*')):
+        result.append({
+            'level': int(_read(index / 'level') or 0),
+            'type': _read(index / 'type'),
+            'size': _size_bytes(_read(index / 'size')),
+            'shared_cpus': _read(index / 'shared_cpu_list'),
+        })
+    return result
+
+
+def numa() -> List[Dict[str, Any]]:
+    result = []
+    for node in sorted(_SYS_NODE.glob('node[0-9]*'), key=lambda p: int(p.name[4:])):
+        meminfo = _read(node / 'meminfo') or ''
+        m = re.search(r'MemTotal:\s+(\d+) kB', meminfo)
+        result.append({
+            'node': int(node.name[4:]),
+            'cpus': _read(node / 'cpulist'),
+            'memory': int(m.group(1)) * 1024 if m else None,
+        })
+    return result
+
+
+def memory_total() -> Optional[int]:
+    m = re.search(r'MemTotal:\s+(\d+) kB', _read(Path('/proc/meminfo')) or '')
+    if m:
+        return int(m.group(1)) * 1024
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def hardware() -> Dict[str, Any]:
+    return {'cpu': cpu(), 'caches': caches(), 'numa': numa(), 'memory': memory_total()}
+
+
+def cached_hardware(env_dir: Optional[Path] = None, refresh: bool = False) -> Dict[str, Any]:
+    """hardware(), cached per host until the next reboot."""
+    env_dir = Path(env_dir or os.environ.get('QFT_ENV_DIR') or DEFAULT_ENV_DIR)
+    host = platform.node()
+    boot_id = _read(Path('/proc/sys/kernel/random/boot_id'))
+    path = env_dir / f'{re.sub(r"[^A-Za-z0-9._-]+", "_", host) or "host"}.json'
+    if not refresh and boot_id is not None:
+        try:
+            cached = json.loads(path.read_text())
+            if cached.get('boot_id') == boot_id:
+                return cached['hardware']
+        except (OSError, ValueError, KeyError):
+            pass
+    info = hardware()
+    if boot_id is not None:
+        try:
+            env_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'boot_id': boot_id, 'hardware': info}, indent=1))
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return info
+
+
+################
+### Software ###
+################
+
+def blas() -> List[Dict[str, Any]]:
+    """Loaded BLAS / OpenMP libraries and their thread counts (threadpoolctl), else numpy's build info."""
+    try:
+        from threadpoolctl import threadpool_info
+    except ImportError:
+        pass
+    else:
+        import numpy  # noqa: F401  (loads the BLAS threadpoolctl inspects)
+        return [
+            {k: lib.get(k) for k in ('user_api', 'internal_api', 'version', 'num_threads', 'threading_layer')}
+            for lib in threadpool_info()
+        ]
+    import numpy as np
+
+    try:
+        deps = np.show_config(mode='dicts')['Build Dependencies']
+    except (TypeError, KeyError):
+        return []
+    return [
+        {'user_api': api, 'internal_api': deps[api].get('name'), 'version': deps[api].get('version')}
+        for api in ('blas', 'lapack') if api in deps
+    ]
+
+
+def versions() -> Dict[str, str]:
+    result = {'python': platform.python_version()}
+    for package in PACKAGES:
+        try:
+            result[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    return result
+
+
+def governors() -> Dict[str, Any]:
+    """Frequency governors in use (usually one), and whether turbo / boost is on."""
+    found = {_read(p) for p in _SYS_CPU.glob('cpu[0-9]*/cpufreq/scaling_governor')} - {None}
+    no_turbo = _read(_SYS_CPU / 'intel_pstate' / 'no_turbo')
+    boost = _read(_SYS_CPU / 'cpufreq' / 'boost')
+    return {
+        'governor': sorted(found),
+        'turbo': None if no_turbo is None and boost is None else (no_turbo == '0' or boost == '1'),
+    }
+
+
+def affinity() -> Optional[int]:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return None
+
+
+###################
+### Fingerprint ###
+###################
+
+def capture(env_dir: Optional[Path] = None, refresh: bool = False) -> Dict[str, Any]:
+    """
+    The environment record. ``env_id`` hashes the parts that make results
+    comparable (hardware, library versions, BLAS, thread settings).
+    """
+    info = {
+        'host': platform.node(),
+        'os': platform.platform(),
+        'python_executable': sys.executable,
+        'hardware': cached_hardware(env_dir, refresh),
+        'affinity': affinity(),
+        'frequency': governors(),
+        'blas': blas(),
+        'threads': {k: os.environ[k] for k in THREAD_VARS if k in os.environ},
+        'versions': versions(),
+    }
+    stable = {k: info[k] for k in ('host', 'hardware', 'blas', 'threads', 'versions')}
+    info['env_id'] = hashlib.sha1(json.dumps(stable, sort_keys=True).encode()).hexdigest()[:12]
+    return info
+
+
+def describe(info: Dict[str, Any]) -> str:
+    """One line for logs: CPU, cores, memory, BLAS."""
+    c = info['hardware']['cpu']
+    mem = info['hardware'].get('memory')
+    libs = ', '.join(dict.fromkeys(
+        f"{b.get('internal_api')} {b.get('version') or ''}".strip()
+        + (f" x{b['num_threads']}" if b.get('num_threads') else '')
+        for b in info['blas']
+    ))
+    return (
+        f"{c.get('model') or 'unknown CPU'} | {c.get('physical_cores') or '?'} cores"
+        f" / {c.get('logical_cores')} threads | {mem / 1024**3:.1f} GiB | {libs or 'BLAS unknown'}"
+        f" | env {info['env_id']}"
+        if mem else
+        f"{c.get('model') or 'unknown CPU'} | {c.get('logical_cores')} threads | env {info['env_id']}"
+    )
+
+# vim:ts=4 sw=4 et:
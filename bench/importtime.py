@@ -0,0 +1,91 @@
+"""
+Import-time benchmark.
+
+Every module is imported in a fresh interpreter started with
+``-X importtime``; the per-import lines it writes to stderr
+(``import time: self [us] | cumulative | imported package``) are parsed to
+sum the time of everything the import statement loaded (imports that also
+happen when the interpreter starts up are left out), and to name the
+slowest ones. The best of ``repeat`` runs is kept, which leaves out the
+one-off cost of writing ``.pyc`` files.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+REPO = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = (
+    'python_sim',
+    'python_sim.qft',
+    'python_sim.qft_vec',
+    'python_sim.qft_sparse',
+    'bench',
+)
+
+_LINE = re.compile(r'^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)\s*$')
+
+
+@dataclass
+class ImportLine:
+    self_us: int
+    cumulative_us: int
+    depth: int
+    name: str
+
+
+def parse_importtime(stderr: str) -> List[ImportLine]:
+    """The ``-X importtime`` lines of ``stderr``, in output order."""
+    lines = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            lines.append(ImportLine(int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return lines
+
+
+def import_once(module: str, python: str = sys.executable) -> List[ImportLine]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO), env.get('PYTHONPATH')]))
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env, cwd=REPO,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}')
+    return parse_importtime(proc.stderr)
+
+
+def measure_import(module: str, repeat: int = 5, top: int = 5) -> Dict[str, object]:
+    """
+    Record with the best import time of ``module`` (``import_ms``), the
+    number of modules it loaded and its ``top`` slowest imports.
+    """
+    startup = {l.name for l in import_once('sys')}
+    best: List[ImportLine] = []
+    best_us = None
+    for _ in range(repeat):
+        lines = [l for l in import_once(module) if l.name not in startup]
+        total = sum(l.self_us for l in lines)
+        if best_us is None or total < best_us:
+            best, best_us = lines, total
+    slowest = sorted(best, key=lambda l: l.self_us, reverse=True)[:top]
+    return {
+        'kind': 'importtime',
+        'module': module,
+        'import_ms': best_us / 1e3,
+        'modules_loaded': len(best),
+        'slowest': [(l.name, l.self_us / 1e3) for l in slowest],
+    }
+
+
+def measure_imports(modules: Sequence[str] = DEFAULT_MODULES, repeat: int = 5) -> List[Dict[str, object]]:
+    return [measure_import(m, repeat) for m in modules]
+
+# vim:ts=4 sw=4 et:
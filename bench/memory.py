@@ -0,0 +1,206 @@
+"""
+Memory measurement shared by all backends and benchmark scripts.
+
+Peak RSS is taken from the kernel instead of polling: ``VmHWM`` in
+``/proc/self/status`` is the exact high-water mark of the resident set, and
+writing ``5`` to ``/proc/self/clear_refs`` resets it to the current RSS, so
+the peak of a single measurement window can be read without a sampling
+thread competing for the GIL. Where ``/proc`` is not available the lifetime
+maximum ``resource.getrusage().ru_maxrss`` is used, which cannot be reset.
+
+A sampling thread is only started on request, to record an RSS timeline
+(memory-over-time curves), or for VRAM, which NVML only reports as a
+current value.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_STATUS = '/proc/self/status'
+_STATM = '/proc/self/statm'
+_CLEAR_REFS = '/proc/self/clear_refs'
+
+
+def _status_kb(field: str) -> Optional[int]:
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open(_STATM) as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """High-water mark of the resident set size in bytes."""
+    hwm = _status_kb('VmHWM:')
+    if hwm is not None:
+        return hwm * 1024
+    if resource is None:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def reset_peak() -> bool:
+    """Reset ``VmHWM`` to the current RSS. Returns False if not supported."""
+    try:
+        with open(_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class PeakMemory:
+    """
+    Peak RSS (and optionally the ``tracemalloc`` peak) of a measurement
+    window, usable as a context manager or via ``start()`` / ``stop()``.
+
+    ``exact`` tells whether the peak belongs to this window only; otherwise
+    it is the lifetime peak of the process. With ``timeline`` set to an
+    interval in seconds, ``(seconds since start, rss bytes)`` samples are
+    collected in ``samples``.
+    """
+
+    def __init__(self, trace_malloc: bool = False, timeline: Optional[float] = None):
+        self.trace_malloc = trace_malloc
+        self.timeline = timeline
+        self.peak_rss = 0
+        self.peak_malloc: Optional[int] = None
+        self.exact = False
+        self.samples: List[Tuple[float, int]] = []
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        start = time.perf_counter()
+        while self._running:
+            self.samples.append((time.perf_counter() - start, current_rss()))
+            time.sleep(self.timeline)
+
+    def start(self) -> 'PeakMemory':
+        if self.trace_malloc:
+            tracemalloc.start()
+        self.exact = reset_peak()
+        self.samples = []
+        if self.timeline:
+            self._running = True
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._running = False
+            self._thread.join()
+            self._thread = None
+        self.peak_rss = peak_rss()
+        if self.trace_malloc:
+            _, self.peak_malloc = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    def __enter__(self) -> 'PeakMemory':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class PeakVram:
+    """
+    Peak VRAM of this process (or of the whole device, if the driver has no
+    per-process accounting) polled through NVML. ``available`` is False if
+    ``pynvml`` or an NVIDIA driver is missing; the peak then stays 0.
+    """
+
+    def __init__(self, gpu_index: Optional[int] = None, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self.total: Optional[int] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+            index = int(os.getenv('GPU_INDEX', '0')) if gpu_index is None else gpu_index
+            self._nvml = pynvml
+            self._handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+            self.total = pynvml.nvmlDeviceGetMemoryInfo(self._handle).total
+            self.available = True
+        except Exception:
+            self._nvml = self._handle = None
+            self.available = False
+
+    def used(self) -> int:
+        nvml, pid, used = self._nvml, os.getpid(), 0
+        for query in (
+            nvml.nvmlDeviceGetComputeRunningProcesses,
+            nvml.nvmlDeviceGetGraphicsRunningProcesses,
+        ):
+            try:
+                for p in query(self._handle):
+                    if getattr(p, 'pid', None) == pid and isinstance(p.usedGpuMemory, int):
+                        used += max(p.usedGpuMemory, 0)
+            except nvml.NVMLError:
+                pass
+        if used == 0:
+            # no per-process accounting: fall back to the device total
+            used = nvml.nvmlDeviceGetMemoryInfo(self._handle).used
+        return used
+
+    def _poll(self) -> None:
+        while self._running:
+            self.peak = max(self.peak, self.used())
+            time.sleep(self.interval)
+
+    def start(self) -> 'PeakVram':
+        self.peak = 0
+        if self.available:
+            self._running = True
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._running = False
+            self._thread.join()
+            self._thread = None
+            self.peak = max(self.peak, self.used())
+
+    def shutdown(self) -> None:
+        if self.available:
+            try:
+                self._nvml.nvmlShutdown()
+            except Exception:
+                pass
+
+    def __enter__(self) -> 'PeakVram':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+# vim:ts=4 sw=4 et:
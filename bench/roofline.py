@@ -0,0 +1,283 @@
+"""
+Roofline-style throughput metrics.
+
+Each cost model returns the bytes moved and the floating point operations of
+one transform (the ``run`` phase) from the known per-stage costs of the
+engine, assuming complex128 amplitudes; ``amp`` rescales the traffic for
+configurations that run in single precision (complex64, 8 bytes; only the
+statevector simulators, which have no index traffic). Dividing by the
+measured run time gives effective GB/s and GFLOP/s, which can be compared
+with the host's memory bandwidth from ``stream()``. The models count
+compulsory traffic only (every operand read once, every result written
+once), so an engine reaching the STREAM bandwidth is bandwidth-bound.
+
+Conventions: a complex multiply-add is 8 flops, a complex multiply 6, a
+complex add 2. Sparse matrices are CSR with 4-byte indices (``format=csr``
+of the sparse engines; their default stores diagonals only).
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+AMP = 16    # bytes per complex128 amplitude
+IDX = 4     # bytes per CSR index
+
+
+@dataclass
+class Cost:
+    bytes: float = 0.0
+    flops: float = 0.0
+
+    def __add__(self, other: 'Cost') -> 'Cost':
+        return Cost(self.bytes + other.bytes, self.flops + other.flops)
+
+    def __mul__(self, k: float) -> 'Cost':
+        return Cost(self.bytes * k, self.flops * k)
+
+    __rmul__ = __mul__
+
+
+###################
+### Stage costs ###
+###################
+
+def dense_kron(N: int) -> Cost:
+    # kron chain of 2x2 factors: partial products of size (N/2^k)^2 sum to 4/3 N^2
+    return Cost(AMP * N * N * 4 / 3, 6 * N * N * 4 / 3)
+
+
+def dense_add(N: int) -> Cost:
+    return Cost(3 * AMP * N * N, 2 * N * N)
+
+
+def dense_matvec(N: int) -> Cost:
+    return Cost(AMP * N * N + 2 * AMP * N, 8 * N * N)
+
+
+def sparse_build(nnz: int) -> Cost:
+    return Cost((AMP + IDX) * nnz, 6 * nnz)
+
+
+def sparse_matvec(N: int, nnz: int) -> Cost:
+    return Cost((AMP + IDX) * nnz + IDX * (N + 1) + 2 * AMP * N, 8 * nnz)
+
+
+def dia_build(N: int) -> Cost:
+    # kron chain of length-2 diagonals: partial products sum to 2N
+    return Cost(2 * AMP * N, 6 * 2 * N)
+
+
+def dia_matvec(N: int) -> Cost:
+    return Cost(3 * AMP * N, 6 * N)
+
+
+def permscale_matvec(N: int) -> Cost:
+    """y = d0 * x + d1 * P x with two scalars per half: nothing but the state is read."""
+    return Cost(2 * AMP * N, 14 * N)
+
+
+def factored_matvec(N: int, factors: int) -> Cost:
+    """A KronOperator matvec: one 2x2 contraction over the state per non-identity factor."""
+    return factors * Cost(2 * AMP * N, 16 * N)
+
+
+def statevector_gate(N: int, touched: float = 1.0, flops_per_amp: float = 6) -> Cost:
+    """A gate applied in place to a statevector, touching a fraction of it."""
+    return Cost(2 * AMP * N * touched, flops_per_amp * N * touched)
+
+
+####################
+### Engine costs ###
+####################
+
+def cost_QFT(n: int) -> Cost:
+    N = 2**n
+    h = dense_kron(N) + dense_matvec(N)
+    cg = 2 * dense_kron(N) + dense_add(N) + dense_matvec(N)
+    return n * h + (n * (n - 1) // 2) * cg
+
+
+def cost_SQFT(n: int) -> Cost:
+    N = 2**n
+    layer = 2 * dense_kron(N) + dense_add(N) + dense_matvec(N)
+    return n * (dense_kron(N) + dense_matvec(N)) + (n - 1) * layer
+
+
+def cost_QFTS(n: int) -> Cost:
+    # format=auto: H layers are PermScale, controlled phases DIA
+    N = 2**n
+    cg = 2 * dia_build(N) + Cost(3 * AMP * N, 2 * N) + dia_matvec(N)
+    return n * permscale_matvec(N) + (n * (n - 1) // 2) * cg
+
+
+def cost_SQFTS(n: int) -> Cost:
+    N = 2**n
+    scg = 2 * dia_build(N) + Cost(3 * AMP * N, 2 * N) + dia_matvec(N)
+    return n * permscale_matvec(N) + (n - 1) * scg
+
+
+def cost_QFTS_csr(n: int) -> Cost:
+    N = 2**n
+    h = sparse_build(2 * N) + sparse_matvec(N, 2 * N)
+    cg = 2 * sparse_build(N // 2) + sparse_build(N) + sparse_matvec(N, N)
+    return n * h + (n * (n - 1) // 2) * cg
+
+
+def cost_SQFTS_csr(n: int) -> Cost:
+    N = 2**n
+    h = sparse_build(2 * N) + sparse_matvec(N, 2 * N)
+    scg = 2 * sparse_build(N // 2) + sparse_build(N) + sparse_matvec(N, N)
+    return n * h + (n - 1) * scg
+
+
+def cost_QFT_factored(n: int) -> Cost:
+    N = 2**n
+    # CG = kron(..M00..) + kron(..M11..gate..): 1 + 2 contractions and an add
+    cg = factored_matvec(N, 3) + Cost(3 * AMP * N, 2 * N)
+    return n * factored_matvec(N, 1) + (n * (n - 1) // 2) * cg
+
+
+def cost_SQFT_factored(n: int) -> Cost:
+    N = 2**n
+    # SCG after bit b: M00 | M11 and b + 1 rotations, then the add
+    scg = sum(
+        (factored_matvec(N, b + 3) + Cost(3 * AMP * N, 2 * N) for b in range(n - 1)),
+        Cost(),
+    )
+    return n * factored_matvec(N, 1) + scg
+
+
+def cost_SQFTV(n: int) -> Cost:
+    """
+    n in-place stages: read the state and the half-size rotation table,
+    write the state; N/2 complex multiplies, N complex adds, N scalings.
+    """
+    N = 2**n
+    return n * Cost(2.5 * AMP * N, 7 * N)
+
+
+def cost_SQFTR(radix: int) -> Callable[[int], Cost]:
+    """
+    ceil(n / r) passes (r = log2(radix)): read and write the state and the
+    r strided twiddle columns of each chunk, one twiddle multiply and a
+    2^r x 2^r butterfly matmul per amplitude.
+    """
+    r = int(np.log2(radix))
+
+    def model(n: int) -> Cost:
+        N = 2**n
+        return -(-n // r) * Cost((2 + r / 2**r) * AMP * N, 6 * N + 8 * 2**r * N)
+
+    return model
+
+
+def cost_statevector(n: int) -> Cost:
+    """
+    Gate-by-gate statevector simulators (Aer, PennyLane): n Hadamards, n(n-1)/2
+    controlled phases touching a quarter of the amplitudes and n/2 swaps
+    touching half of them. Gate fusion reduces the real traffic below this.
+    """
+    N = 2**n
+    return (
+        n * statevector_gate(N)
+        + (n * (n - 1) // 2) * statevector_gate(N, 0.25)
+        + (n // 2) * statevector_gate(N, 0.5, 0)
+    )
+
+
+def cost_fft(n: int) -> Cost:
+    """Lower bound: one read and one write of the state, 5 N log2 N flops."""
+    N = 2**n
+    return Cost(2 * AMP * N, 5 * N * n)
+
+
+COST_MODELS: Dict[Tuple[str, Optional[str]], Callable[[int], Cost]] = {
+    ('python_sim', 'QFT'): cost_QFT,
+    ('python_sim', 'SQFT'): cost_SQFT,
+    ('python_sim', 'QFTS'): cost_QFTS,
+    ('python_sim', 'SQFTS'): cost_SQFTS,
+    ('python_sim', 'QFTS,csr'): cost_QFTS_csr,
+    ('python_sim', 'SQFTS,csr'): cost_SQFTS_csr,
+    ('python_sim', 'QFT,factored'): cost_QFT_factored,
+    ('python_sim', 'SQFT,factored'): cost_SQFT_factored,
+    ('python_sim', 'QFTS,factored'): cost_QFT_factored,
+    ('python_sim', 'SQFTS,factored'): cost_SQFT_factored,
+    ('python_sim', 'SQFTV'): cost_SQFTV,
+    ('python_sim', 'SQFTR,radix=2'): cost_SQFTR(2),
+    ('python_sim', 'SQFTR,radix=4'): cost_SQFTR(4),
+    ('python_sim', 'SQFTR,radix=8'): cost_SQFTR(8),
+    ('python_sim', 'SQFTD'): cost_SQFTV,
+    ('qiskit_aer', None): cost_statevector,
+    ('pennylane', None): cost_statevector,
+}
+
+
+def cost(backend: str, variant: Optional[str], n: int, amp: int = AMP) -> Optional[Cost]:
+    """
+    Cost model of a backend / variant (``Backend.cost_variant``, which may
+    name an engine mode too); ``(backend, None)`` covers all variants.
+    ``amp`` is the bytes per amplitude of the run.
+    """
+    model = COST_MODELS.get((backend, variant)) or COST_MODELS.get((backend, None))
+    if model is None:
+        return None
+    c = model(n)
+    return c if amp == AMP else Cost(c.bytes * amp / AMP, c.flops)
+
+
+def throughput(
+    backend: str,
+    variant: Optional[str],
+    n: int,
+    seconds: float,
+    amp: int = AMP,
+) -> Dict[str, float]:
+    """Record fields ``bytes_moved``, ``flops``, ``gbps`` and ``gflops``."""
+    c = cost(backend, variant, n, amp)
+    if c is None or seconds <= 0:
+        return {}
+    return {
+        'bytes_moved': c.bytes,
+        'flops': c.flops,
+        'gbps': c.bytes / seconds / 1e9,
+        'gflops': c.flops / seconds / 1e9,
+    }
+
+
+##############
+### STREAM ###
+##############
+
+def stream(size: int = 1 << 25, repeat: int = 5) -> Dict[str, float]:
+    """
+    STREAM-like host bandwidth probe on float64 arrays of ``size`` elements
+    (default 256 MiB each). Best-of-``repeat`` GB/s for copy, scale, add and
+    triad, counted with the STREAM byte conventions (16, 16, 24, 24 bytes
+    per element). numpy evaluates the triad in two passes, so its figure is
+    a lower bound of what the hardware sustains.
+    """
+    a = np.full(size, 1.0)
+    b = np.full(size, 2.0)
+    c = np.zeros(size)
+    s = 3.0
+    kernels = {
+        'copy': (16, lambda: np.copyto(c, a)),
+        'scale': (16, lambda: np.multiply(c, s, out=b)),
+        'add': (24, lambda: np.add(a, b, out=c)),
+        'triad': (24, lambda: (np.multiply(c, s, out=a), np.add(a, b, out=a))),
+    }
+    result = {}
+    for name, (bytes_per_elem, kernel) in kernels.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            kernel()
+            best = min(best, time.perf_counter() - start)
+        result[f'{name}_gbps'] = bytes_per_elem * size / best / 1e9
+    result['array_bytes'] = a.nbytes
+    return result
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,259 @@
+"""
+Measurement loop shared by all backends.
+
+For every dimension one input state is taken from the ``StateProvider``
+and handed to every backend, so all frameworks transform identical inputs.
+With ``verify`` enabled every backend is first checked against the FFT
+reference for that dimension and only timed if it is correct. Each backend phase is
+timed with ``time.perf_counter`` and the whole prepare..run sequence runs
+inside one ``PeakMemory`` window.
+
+Batched backends (option ``batch=K``) get K states (seeds ``seed`` ..
+``seed + K - 1``) per run; ``time_run_per_state`` and ``time_total_per_state``
+divide by K, and the throughput figures are per state as well, so batched
+and single-state runs compare directly.
+
+With ``max_time`` / ``max_memory`` a backend is not run on a dimension whose
+total time or peak RSS, extrapolated from its smaller dimensions (this run
+plus ``history``, see ``bench.scaling``), exceeds the limit; it gets a
+``skipped`` record instead and no larger dimensions.
+
+The host environment (``bench.environment``) is stored once per run as a
+``kind=environment`` record; every result carries its ``env_id``.
+"""
+
+import itertools
+import platform
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .backends import Backend
+from .environment import capture
+from .memory import PeakMemory
+from .roofline import throughput
+from .scaling import infeasible
+from .states import StateProvider
+from .store import ResultStore
+from .verify import reference, verify as verify_backend
+
+PHASES = ('prepare', 'build', 'compile', 'run')
+
+
+def parse_dims(text: str) -> List[int]:
+    """``"1:20"`` (inclusive range), ``"4,8,12"`` or a single ``"20"``."""
+    dims: List[int] = []
+    for part in text.split(','):
+        start, sep, stop = part.partition(':')
+        if sep:
+            dims.extend(range(int(start), int(stop) + 1))
+        else:
+            dims.append(int(part))
+    return dims
+
+
+def new_run_id() -> str:
+    return time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+
+
+def measure(
+    backend: Backend,
+    dim: int,
+    state: np.ndarray,
+    trace_malloc: bool = False,
+    timeline: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Run all phases of ``backend`` once and return the timings / peaks."""
+    times = {}
+    with PeakMemory(trace_malloc=trace_malloc, timeline=timeline) as mem:
+        start = time.perf_counter()
+        backend.prepare(dim, state)
+        times['prepare'] = time.perf_counter() - start
+        for phase in PHASES[1:]:
+            start = time.perf_counter()
+            output = getattr(backend, phase)()
+            times[phase] = time.perf_counter() - start
+    del output
+    metrics = backend.metrics()
+    backend.reset()
+
+    record = {f'time_{phase}': times[phase] for phase in PHASES}
+    record['time_total'] = sum(times.values())
+    record['peak_rss'] = mem.peak_rss
+    record['peak_rss_exact'] = mem.exact
+    if timeline:
+        record['rss_timeline'] = mem.samples
+    if mem.peak_malloc is not None:
+        record['peak_malloc'] = mem.peak_malloc
+    record.update(metrics)
+    return record
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    if record['status'] != 'ok':
+        return f"{record['label']} n={record['dim']} ... {record['status']}: {record.get('error', '')}"
+    phases = ' ... '.join(f"{record[f'time_{p}']:.2f}s" for p in PHASES)
+    line = (
+        f"{record['label']} n={record['dim']} ... {phases} ... "
+        f"{record['time_total']:.2f}s ... {record['peak_rss']/1024**2:.1f}MB"
+    )
+    if record.get('batch', 1) > 1:
+        line += f" ... {record['time_run_per_state']*1e3:.3f}ms/state run"
+    return line
+
+
+def run_benchmark(
+    backends: Sequence[Backend],
+    dims: Sequence[int],
+    store: Optional[ResultStore] = None,
+    repeat: int = 1,
+    states: Optional[StateProvider] = None,
+    trace_malloc: bool = False,
+    timeline: Optional[float] = None,
+    log: Callable[[str], None] = print,
+    records: Optional[List[Dict[str, Any]]] = None,
+    verify: bool = False,
+    atol: Optional[float] = None,
+    max_time: Optional[float] = None,
+    max_memory: Optional[float] = None,
+    history: Sequence[Dict[str, Any]] = (),
+    environment: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Benchmark every backend on every dimension. Records are appended to
+    ``store`` (if given) and to ``records`` as soon as they are measured, so
+    an interrupted run keeps everything measured so far. ``environment``
+    defaults to ``bench.environment.capture()``.
+    """
+    run_id = new_run_id()
+    host = platform.node()
+    environment = environment or capture()
+    env_id = environment['env_id']
+    if store is not None:
+        store.append({'kind': 'environment', 'run_id': run_id, 'timestamp': time.time(), **environment})
+    states = states or StateProvider()
+    failed = set()
+    records = [] if records is None else records
+
+    for dim in dims:
+        state = states.get(dim)
+        expected = reference(state) if verify else None
+        batches: Dict[int, np.ndarray] = {}
+        for backend in backends:
+            if backend.label in failed or not backend.supports(dim):
+                continue
+            if max_time is not None or max_memory is not None:
+                past = [
+                    r for r in itertools.chain(history, records)
+                    if r.get('label') == backend.label and r.get('host') == host
+                ]
+                reason = infeasible(past, dim, max_time, max_memory)
+                if reason is not None:
+                    failed.add(backend.label)
+                    record = _base_record(run_id, host, env_id, backend, dim, 0, states.seed)
+                    record.update(status='skipped', error=reason)
+                    records.append(record)
+                    if store is not None:
+                        store.append(record)
+                    log(format_record(record))
+                    continue
+            k = backend.batch
+            if k > 1 and k not in batches:
+                batches[k] = states.batch(dim, k)
+            inputs = batches[k] if k > 1 else state
+            checked = {}
+            if verify:
+                check = verify_backend(backend, dim, state, expected, atol)
+                log(str(check))
+                checked = {
+                    'verify_max_error': check.max_error,
+                    'verify_l2_error': check.l2_error,
+                }
+                if not check.ok:
+                    # a wrong engine is not timed, neither here nor for larger dims
+                    failed.add(backend.label)
+                    record = _base_record(run_id, host, env_id, backend, dim, 0, states.seed)
+                    record.update(checked, status='incorrect', error=check.error or '')
+                    records.append(record)
+                    if store is not None:
+                        store.append(record)
+                    continue
+            for rep in range(repeat):
+                record = _base_record(run_id, host, env_id, backend, dim, rep, states.seed)
+                record.update(checked)
+                try:
+                    record.update(measure(backend, dim, inputs, trace_malloc, timeline))
+                    record['batch'] = k
+                    record['time_run_per_state'] = record['time_run'] / k
+                    record['time_total_per_state'] = record['time_total'] / k
+                    record.update(throughput(
+                        backend.name, backend.cost_variant, dim, record['time_run_per_state'],
+                        backend.amplitude_bytes,
+                    ))
+                    record['status'] = 'ok'
+                except Exception as e:
+                    # larger dims won't do better, so stop this backend here
+                    backend.reset()
+                    failed.add(backend.label)
+                    record.update(status=type(e).__name__, error=str(e))
+                records.append(record)
+                if store is not None:
+                    store.append(record)
+                log(format_record(record))
+                if record['status'] != 'ok':
+                    break
+        del state, expected, batches
+
+    return records
+
+
+def _base_record(
+    run_id: str,
+    host: str,
+    env_id: str,
+    backend: Backend,
+    dim: int,
+    rep: int,
+    seed: int,
+) -> Dict[str, Any]:
+    return {
+        'run_id': run_id,
+        'timestamp': time.time(),
+        'host': host,
+        'env_id': env_id,
+        'backend': backend.name,
+        'variant': backend.variant,
+        'label': backend.label,
+        'config': backend.config(),
+        'dim': dim,
+        'repeat': rep,
+        'seed': seed,
+    }
+
+
+def summary_table(
+    records: Sequence[Dict[str, Any]],
+    field: str = 'time_total',
+    scale: float = 1.0,
+) -> str:
+    """Median of ``field`` / ``scale`` per dimension (rows) and backend label (columns)."""
+    labels = list(dict.fromkeys(r['label'] for r in records))
+    dims = sorted({r['dim'] for r in records})
+    cells: Dict[Any, List[float]] = {}
+    for r in records:
+        if r['status'] == 'ok' and field in r:
+            cells.setdefault((r['dim'], r['label']), []).append(r[field])
+
+    width = max([len(l) for l in labels] + [12])
+    lines = ['DIM  ' + ' '.join(f'{l:>{width}}' for l in labels)]
+    for dim in dims:
+        row = []
+        for label in labels:
+            values = cells.get((dim, label))
+            row.append(f'{np.median(values) / scale:>{width}.6g}' if values else ' ' * width)
+        lines.append(f'{dim:<4} ' + ' '.join(row))
+    return '\n'.join(lines)
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,290 @@
+"""
+Scaling-law fits and extrapolation.
+
+Runtime and memory of an engine are fitted in log space to
+
+- ``exp``:  y = a * b^n      (log y = log a + n log b)
+- ``nexp``: y = a * n * 2^n  (log y = log a + log n + n log 2)
+
+by least squares over the largest ``window`` dimensions measured (the small
+ones are dominated by fixed costs). Memory is fitted as ``c + model``: peak
+RSS includes the interpreter and libraries (~60 MB), which would flatten a
+pure exponential badly. The constant ``c`` is found by profiling the
+residuals over ``0 <= c < min(y)``. Parameter confidence intervals and the
+prediction intervals of extrapolated values use Student's t with the
+residual scatter of the fit, so a noisy fit from few points gives wide
+bands. ``best`` picks the model with the lower AIC.
+
+The runner uses the fits to skip dimensions predicted to exceed a time or
+memory limit before spending hours on them (``run --max-time / --max-memory``);
+``python -m bench predict`` prints the prediction table.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MODELS = ('exp', 'nexp')
+
+DEFAULT_WINDOW = 6
+DEFAULT_LEVEL = 0.95
+
+# record field fitted for time and memory
+TIME_FIELD = 'time_total'
+MEMORY_FIELD = 'peak_rss'
+
+# candidate constants c = (1 - q) * min(y) of an offset fit
+OFFSET_GRID = 1 - np.geomspace(1, 1e-4, 200)
+
+
+def t_quantile(level: float, dof: int) -> float:
+    """Two-sided Student t quantile (normal quantile without scipy)."""
+    q = 0.5 + level / 2
+    try:
+        from scipy.stats import t
+    except ImportError:
+        return NormalDist().inv_cdf(q)
+    return float(t.ppf(q, dof))
+
+
+def _design(model: str, n: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(design matrix, fixed offset) of log y for dimensions ``n``."""
+    n = np.asarray(n, dtype=float)
+    if model == 'exp':
+        return np.stack([np.ones_like(n), n], axis=-1), np.zeros_like(n)
+    if model == 'nexp':
+        return np.ones_like(n)[..., None], np.log(n) + n * math.log(2)
+    raise ValueError(f'unknown model {model!r} (choose from {", ".join(MODELS)})')
+
+
+@dataclass
+class Prediction:
+    value: float
+    lo: float
+    hi: float
+
+
+@dataclass
+class Fit:
+    model: str
+    coef: np.ndarray        # log-space coefficients
+    cov: np.ndarray         # their covariance
+    sigma: float            # residual standard deviation (log space)
+    dims: Tuple[int, ...]
+    rss: float
+    offset: Optional[float] = None  # fitted constant c of an offset fit
+
+    @property
+    def k(self) -> int:
+        return len(self.coef) + (self.offset is not None)
+
+    @property
+    def dof(self) -> int:
+        return len(self.dims) - self.k
+
+    @property
+    def aic(self) -> float:
+        m = len(self.dims)
+        return m * math.log(max(self.rss, 1e-300) / m) + 2 * self.k
+
+    def params(self, level: float = DEFAULT_LEVEL) -> Dict[str, Prediction]:
+        """``a`` (and ``b`` for exp) with confidence intervals."""
+        t = t_quantile(level, self.dof)
+        names = ('a', 'b') if self.model == 'exp' else ('a',)
+        result = {}
+        for i, name in enumerate(names):
+            c, se = self.coef[i], math.sqrt(self.cov[i, i])
+            result[name] = Prediction(math.exp(c), math.exp(c - t * se), math.exp(c + t * se))
+        return result
+
+    def predict(self, n: int, level: float = DEFAULT_LEVEL) -> Prediction:
+        """Value at dimension ``n`` with its prediction interval."""
+        x, offset = _design(self.model, np.array([n]))
+        mu = float(x[0] @ self.coef + offset[0])
+        se = math.sqrt(float(x[0] @ self.cov @ x[0]) + self.sigma**2)
+        t = t_quantile(level, self.dof)
+        c = self.offset or 0.0
+        return Prediction(c + math.exp(mu), c + math.exp(mu - t * se), c + math.exp(mu + t * se))
+
+    def describe(self) -> str:
+        p = self.params()
+        c = '' if self.offset is None else f'c={self.offset:.4g} '
+        text = f"{self.model}: {c}a={p['a'].value:.3g}"
+        if 'b' in p:
+            text += f" b={p['b'].value:.4g} [{p['b'].lo:.4g}, {p['b'].hi:.4g}]"
+        return text + f' (n={min(self.dims)}..{max(self.dims)})'
+
+
+def fit(
+    dims: Sequence[int],
+    values: Sequence[float],
+    model: str = 'exp',
+    window: Optional[int] = DEFAULT_WINDOW,
+    offset: bool = False,
+) -> Fit:
+    """
+    Least-squares fit of ``model`` (``c + model`` with ``offset``) to the
+    largest ``window`` dims with a positive value.
+    """
+    points = sorted((int(n), float(v)) for n, v in zip(dims, values) if v is not None and v > 0)
+    if window:
+        points = points[-window:]
+    ns = np.array([n for n, _ in points])
+    x, shift = _design(model, ns)
+    k = x.shape[1] + offset
+    if len(points) <= k:
+        raise ValueError(f'{model} fit needs more than {k} points, got {len(points)}')
+    v = np.array([v for _, v in points])
+    best = None
+    for c in (OFFSET_GRID * v.min() if offset else [0.0]):
+        y = np.log(v - c) - shift
+        coef, *_ = np.linalg.lstsq(x, y, rcond=None)
+        resid = y - x @ coef
+        rss = float(resid @ resid)
+        if best is None or rss < best[2]:
+            best = (c, coef, rss)
+    c, coef, rss = best
+    sigma2 = rss / (len(points) - k)
+    cov = sigma2 * np.linalg.inv(x.T @ x)
+    return Fit(model, coef, cov, math.sqrt(sigma2), tuple(ns.tolist()), rss, float(c) if offset else None)
+
+
+def best_fit(
+    dims: Sequence[int],
+    values: Sequence[float],
+    models: Sequence[str] = MODELS,
+    window: Optional[int] = DEFAULT_WINDOW,
+    offset: bool = False,
+) -> Fit:
+    """The model with the lowest AIC among those that can be fitted."""
+    fits = []
+    for model in models:
+        try:
+            fits.append(fit(dims, values, model, window, offset))
+        except ValueError:
+            pass
+    if not fits:
+        raise ValueError(f'too few points to fit any of {", ".join(models)}')
+    return min(fits, key=lambda f: f.aic)
+
+
+def fit_model(
+    dims: Sequence[int],
+    values: Sequence[float],
+    model: str = 'best',
+    window: Optional[int] = DEFAULT_WINDOW,
+    offset: bool = False,
+) -> Fit:
+    if model == 'best':
+        return best_fit(dims, values, window=window, offset=offset)
+    return fit(dims, values, model, window, offset)
+
+
+######################
+### Record helpers ###
+######################
+
+def series(
+    records: Iterable[Dict[str, Any]],
+    field: str,
+    label: Optional[str] = None,
+) -> Dict[str, Tuple[List[int], List[float]]]:
+    """Per label (matching the ``label`` regex), the dims and median ``field`` of ok records."""
+    pattern = re.compile(label) if label else None
+    values: Dict[str, Dict[int, List[float]]] = {}
+    for r in records:
+        if r.get('status') != 'ok' or r.get(field) is None:
+            continue
+        if pattern is not None and not pattern.search(r['label']):
+            continue
+        values.setdefault(r['label'], {}).setdefault(r['dim'], []).append(r[field])
+    return {
+        lab: (sorted(by_dim), [float(np.median(by_dim[n])) for n in sorted(by_dim)])
+        for lab, by_dim in values.items()
+    }
+
+
+def fit_records(
+    records: Iterable[Dict[str, Any]],
+    field: str,
+    label: Optional[str] = None,
+    model: str = 'best',
+    window: Optional[int] = DEFAULT_WINDOW,
+    offset: bool = False,
+) -> Dict[str, Fit]:
+    """Fits per label; labels with too few dimensions are left out."""
+    fits = {}
+    for lab, (dims, values) in series(records, field, label).items():
+        try:
+            fits[lab] = fit_model(dims, values, model, window, offset)
+        except ValueError:
+            pass
+    return fits
+
+
+def prediction_table(
+    fits: Dict[str, Dict[str, Fit]],
+    dims: Sequence[int],
+    level: float = DEFAULT_LEVEL,
+) -> str:
+    """
+    One row per label and dimension with the predicted value and interval
+    of every metric in ``fits`` (metric -> label -> Fit).
+    """
+    metrics = list(fits)
+    labels = sorted({lab for by_label in fits.values() for lab in by_label})
+    header = f'{"LABEL":<32} {"DIM":>4}' + ''.join(f' {m:>34}' for m in metrics)
+    rows = [header]
+    for lab in labels:
+        for n in dims:
+            cells = []
+            for m in metrics:
+                f = fits[m].get(lab)
+                if f is None:
+                    cells.append(f' {"-":>34}')
+                    continue
+                p = f.predict(n, level)
+                cells.append(f' {p.value:>10.4g} [{p.lo:>9.3g}, {p.hi:>9.3g}]')
+            rows.append(f'{lab:<32} {n:>4}' + ''.join(cells))
+    return '\n'.join(rows)
+
+
+def infeasible(
+    history: Iterable[Dict[str, Any]],
+    dim: int,
+    max_time: Optional[float] = None,
+    max_memory: Optional[float] = None,
+    model: str = 'best',
+) -> Optional[str]:
+    """
+    Why ``dim`` should be skipped for the records in ``history`` (one
+    backend configuration): the reason if the predicted total time or peak
+    RSS exceeds its limit, else None (also when there is too little data).
+    """
+    history = [r for r in history if r.get('dim', dim) < dim]
+    # field, limit, offset fit, display unit and scale
+    checks = (
+        (TIME_FIELD, max_time, False, 's', 1.0),
+        (MEMORY_FIELD, max_memory, True, 'MB', 1024**2),
+    )
+    for field, limit, offset, unit, scale in checks:
+        if limit is None:
+            continue
+        by_label = series(history, field)
+        if not by_label:
+            continue
+        dims, values = next(iter(by_label.values()))
+        try:
+            f = fit_model(dims, [v / scale for v in values], model, offset=offset)
+        except ValueError:
+            continue
+        p = f.predict(dim)
+        if p.value > limit / scale:
+            return f'predicted {field} {p.value:.4g}{unit} > {limit / scale:.4g}{unit} ({f.describe()})'
+    return None
+
+# vim:ts=4 sw=4 et:
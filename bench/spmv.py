@@ -0,0 +1,77 @@
+"""
+Thread scaling of the parallel sparse matvec (``python_sim.spmv``).
+
+The matrices are the two kinds of layers the sparse engines apply: the
+Hadamard layer of the top qubit (two nonzeros per row, half of them far
+off the diagonal) and a diagonal controlled-phase layer. They are built
+directly in CSR form, so large dimensions fit in memory. For every thread
+count the best of ``repeat`` products is kept; ``speedup`` is relative to
+one thread (scipy's own single-threaded kernel).
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+from python_sim.spmv import matvec
+from python_sim.twiddle import twiddles
+
+AMP = 16    # bytes per complex128 amplitude
+IDX = 4     # bytes per CSR index
+
+LAYERS = ('hadamard', 'phase')
+
+
+def default_threads() -> List[int]:
+    """1, 2, 4, ... up to the number of cores (which is always included)."""
+    cores = os.cpu_count() or 1
+    counts = [1 << k for k in range(cores.bit_length()) if 1 << k <= cores]
+    return counts + ([cores] if counts[-1] != cores else [])
+
+
+def layer(kind: str, dim: int) -> sp.csr_matrix:
+    N = 2**dim
+    if kind == 'hadamard':
+        H = sp.csr_matrix(np.array([[1, 1], [1, -1]], dtype=complex) / np.sqrt(2))
+        return sp.kron(H, sp.identity(N // 2, dtype=complex, format='csr'), format='csr')
+    if kind == 'phase':
+        rots = twiddles().rots(dim - 1)
+        return sp.diags(np.concatenate([np.ones(N // 2, dtype=complex), rots])).tocsr()
+    raise ValueError(f'unknown layer {kind!r} (choose from {", ".join(LAYERS)})')
+
+
+def measure_spmv(
+    kind: str,
+    dim: int,
+    threads: Optional[Sequence[int]] = None,
+    repeat: int = 5,
+) -> List[Dict[str, object]]:
+    """One record per thread count with the best time, speedup and GB/s."""
+    A = layer(kind, dim)
+    x = np.random.default_rng(0).normal(size=A.shape[1]) + 0j
+    nbytes = (AMP + IDX) * A.nnz + IDX * (A.shape[0] + 1) + 2 * AMP * A.shape[0]
+    records = []
+    for t in threads or default_threads():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matvec(A, x, threads=t, min_nnz=0)
+            best = min(best, time.perf_counter() - start)
+        records.append({
+            'kind': 'spmv',
+            'layer': kind,
+            'dim': dim,
+            'nnz': int(A.nnz),
+            'threads': t,
+            'time_s': best,
+            'gbps': nbytes / best / 1e9,
+        })
+    base = next((r['time_s'] for r in records if r['threads'] == 1), records[0]['time_s'])
+    for r in records:
+        r['speedup'] = base / r['time_s']
+    return records
+
+# vim:ts=4 sw=4 et:
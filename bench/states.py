@@ -0,0 +1,139 @@
+"""
+Seeded input states shared by all backends.
+
+States are generated once per (seed, dimension), stored as ``.npy`` files
+and handed out as read-only memory maps, so every engine starts from the same
+bytes and repeated runs pay almost nothing for initialisation. The cache
+directory defaults to ``results/states`` in the repository and can be moved
+with the ``QFT_STATE_DIR`` environment variable.
+
+``generate`` fills the output buffer (for the cache: the ``.npy`` memory map
+itself) chunk by chunk, each chunk from its own ``SeedSequence.spawn``
+stream, accumulating the squared norm on the way, and then scales it in a
+second pass. No temporaries of state size are allocated, and the chunks are
+spread over threads (numpy's generators and BLAS release the GIL). The
+bytes depend on the seed, the dimension and ``CHUNK`` only, not on the
+thread count.
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+DEFAULT_STATE_DIR = Path(__file__).resolve().parent.parent / 'results' / 'states'
+
+# bump whenever generate() produces different bytes for the same seed
+GENERATOR_VERSION = 2
+
+# amplitudes per random stream (16 MiB); part of the generated bytes
+CHUNK = 1 << 20
+
+
+def default_threads() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def generate(
+    dim: int,
+    seed: int,
+    out: Optional[np.ndarray] = None,
+    threads: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Normalised complex Gaussian state of ``dim`` qubits, written into
+    ``out`` (a contiguous complex128 array of ``2**dim`` entries) if given.
+    """
+    size = 2**dim
+    if out is None:
+        out = np.empty(size, dtype=np.complex128)
+    if out.shape != (size,) or out.dtype != np.complex128 or not out.flags.c_contiguous:
+        raise ValueError(f'out must be a contiguous complex128 array of {size} entries')
+    bounds = [(lo, min(lo + CHUNK, size)) for lo in range(0, size, CHUNK)]
+    streams = np.random.SeedSequence([seed, dim]).spawn(len(bounds))
+    floats = out.view(np.float64)
+
+    def fill(i: int) -> float:
+        lo, hi = bounds[i]
+        part = floats[2 * lo:2 * hi]
+        np.random.Generator(np.random.PCG64(streams[i])).standard_normal(out=part)
+        return float(part @ part)
+
+    def scale(i: int, factor: float) -> None:
+        lo, hi = bounds[i]
+        floats[2 * lo:2 * hi] *= factor
+
+    workers = min(threads or default_threads(), len(bounds))
+    if workers <= 1:
+        norm = math.sqrt(math.fsum(map(fill, range(len(bounds)))))
+        for i in range(len(bounds)):
+            scale(i, 1 / norm)
+        return out
+    with ThreadPoolExecutor(workers) as pool:
+        norm = math.sqrt(math.fsum(pool.map(fill, range(len(bounds)))))
+        list(pool.map(scale, range(len(bounds)), [1 / norm] * len(bounds)))
+    return out
+
+
+class StateProvider:
+    def __init__(
+        self,
+        seed: int = 0,
+        cache_dir: Union[str, Path, None] = None,
+        cache: bool = True,
+    ):
+        self.seed = seed
+        self.cache_dir = Path(cache_dir or os.getenv('QFT_STATE_DIR') or DEFAULT_STATE_DIR)
+        self.cache = cache
+
+    def path(self, dim: int) -> Path:
+        return self.cache_dir / f'state_n{dim:02d}_s{self.seed}_v{GENERATOR_VERSION}.npy'
+
+    def get(self, dim: int) -> np.ndarray:
+        """
+        The input state for ``dim`` qubits. With caching enabled this is a
+        read-only ``np.memmap``; callers that transform in place must copy.
+        """
+        if not self.cache:
+            return generate(dim, self.seed)
+        path = self.path(dim)
+        if not path.exists():
+            self._store(path, dim)
+        return np.load(path, mmap_mode='r')
+
+    def batch(self, dim: int, count: int) -> np.ndarray:
+        """
+        ``count`` input states for ``dim`` qubits as a ``(count, 2**dim)``
+        array: the states of seeds ``seed``, ``seed + 1``, ...
+        """
+        states = np.empty((count, 2**dim), dtype=np.complex128)
+        for i in range(count):
+            if self.cache:
+                states[i] = StateProvider(self.seed + i, self.cache_dir).get(dim)
+            else:
+                generate(dim, self.seed + i, out=states[i])
+        return states
+
+    def _store(self, path: Path, dim: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write under a temporary name so concurrent readers never see half a file;
+        # the state is generated straight into the file's memory map
+        tmp = path.with_name(f'{path.stem}.{os.getpid()}.tmp.npy')
+        state = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.complex128, shape=(2**dim,))
+        generate(dim, self.seed, out=state)
+        state.flush()
+        del state
+        os.replace(tmp, path)
+
+    def clear(self, dim: Optional[int] = None) -> None:
+        pattern = f'state_n{dim:02d}_s{self.seed}_v*.npy' if dim is not None else '*.npy'
+        for path in self.cache_dir.glob(pattern):
+            path.unlink()
+
+# vim:ts=4 sw=4 et:
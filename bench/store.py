@@ -0,0 +1,65 @@
+"""
+Result store: one JSON object per line, appended as measurements come in.
+
+Every record carries the run id, host and backend configuration next to the
+measured values, so results of different runs and machines can live in the
+same file and be filtered afterwards.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Union
+
+import numpy as np
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'cannot store {type(value).__name__} in the result store')
+
+
+class ResultStore:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=_to_json) + '\n')
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def records(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over stored records. Keyword filters match record fields
+        exactly; a list / tuple / set value matches any of its members.
+        """
+        if not self.path.exists():
+            return
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if all(_matches(record.get(k), v) for k, v in filters.items()):
+                    yield record
+
+    def to_frame(self, **filters: Any):
+        import pandas as pd
+
+        return pd.DataFrame.from_records(list(self.records(**filters)))
+
+
+def _matches(value: Any, wanted: Any) -> bool:
+    if isinstance(wanted, (list, tuple, set, frozenset)):
+        return value in wanted
+    return value == wanted
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,84 @@
+"""
+Correctness check of every backend against an FFT reference.
+
+All engines implement the QFT with the positive root of unity,
+``|j> -> 1/sqrt(N) sum_k exp(2 pi i jk / N) |k>``, which is
+``sqrt(N) * ifft``. Backends hand back their statevector in natural bit
+order (``Backend.statevector`` undoes swapped outputs and transpiler
+layouts), so the check is a plain distance between two vectors.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .backends import Backend
+
+# elements per step of the chunked error reduction
+CHUNK = 1 << 20
+
+
+def reference(state: np.ndarray) -> np.ndarray:
+    return np.sqrt(len(state)) * np.fft.ifft(state)
+
+
+def error_norms(a: np.ndarray, b: np.ndarray, chunk: int = CHUNK) -> Tuple[float, float]:
+    """Max abs and L2 norm of ``a - b``, without a full-size temporary."""
+    max_err = 0.0
+    sq_err = 0.0
+    for start in range(0, len(a), chunk):
+        diff = a[start:start + chunk] - b[start:start + chunk]
+        sq_err += np.vdot(diff, diff).real
+        max_err = max(max_err, float(np.abs(diff).max()))
+    return max_err, float(np.sqrt(sq_err))
+
+
+@dataclass
+class Verification:
+    label: str
+    dim: int
+    ok: bool
+    max_error: float = float('nan')
+    l2_error: float = float('nan')
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        verdict = 'ok' if self.ok else 'WRONG'
+        detail = f'max |err| {self.max_error:.3e}, L2 {self.l2_error:.3e}'
+        if self.error:
+            detail = self.error
+        return f'verify {self.label} n={self.dim} ... {verdict} ... {detail}'
+
+
+def verify(
+    backend: Backend,
+    dim: int,
+    state: np.ndarray,
+    expected: Optional[np.ndarray] = None,
+    atol: Optional[float] = None,
+) -> Verification:
+    """
+    Run ``backend`` once with a statevector readout and compare with the
+    reference. Exceptions inside the backend count as a failed check.
+    """
+    atol = backend.atol if atol is None else atol
+    checker = backend if backend.readout == 'state' else backend.clone(readout='state')
+    if expected is None:
+        expected = reference(np.asarray(state))
+    try:
+        checker.prepare(dim, state)
+        checker.build()
+        checker.compile()
+        result = checker.statevector(checker.run())
+    except Exception as e:
+        return Verification(backend.label, dim, False, error=f'{type(e).__name__}: {e}')
+    finally:
+        checker.reset()
+
+    if result is None or result.shape != expected.shape:
+        return Verification(backend.label, dim, False, error='no statevector of the right size')
+    max_err, l2_err = error_norms(result, expected)
+    return Verification(backend.label, dim, bool(l2_err <= atol), max_err, l2_err)
+
+# vim:ts=4 sw=4 et:
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Plot pipeline for the benchmark results.
+
+Sources:
+- the result store of ``python -m bench run`` (results/bench.jsonl): one
+  figure per host and metric, one series per backend configuration
+  (label), the median over repetitions per DIM; filter by host, label
+  (regular expression) and DIM
+- a hand-edited summary_results.txt (--summary), parsed like
+  plot_summary_results6.py
+
+With --fit every series gets a scaling-law fit (bench.scaling: a*b^n,
+a*n*2^n or the better of both) drawn over the measured points up to
+--extrapolate with its prediction interval; --fit-table writes the
+predicted values per series and DIM as a tab-separated table.
+
+Every figure is rendered in both variants in one pass: the block's own Y
+scale into --save-dir and a linear Y axis into <save-dir>_lin (the layout of
+plots6a / plots6a_lin). Figures are rendered in parallel by a process pool.
+A figure is only redrawn if the hash of its data and style differs from the
+one recorded in <dir>/.plot_hashes.json or its PNG is missing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from plot_summary_results6 import PlotBlock, figure_name, parse_file
+
+REPO = Path(__file__).resolve().parent.parent
+
+# bump when the rendering changes, so every figure is redrawn once
+STYLE_VERSION = 1
+
+HASH_FILE = ".plot_hashes.json"
+
+
+# ============================
+# Store queries
+# ============================
+
+@dataclass(frozen=True)
+class Metric:
+    field: str
+    name: str
+    unit: str
+    scale: str
+    factor: float = 1.0
+
+
+METRICS: Dict[str, Metric] = {
+    "time_run": Metric("time_run", "run time", "s", "log"),
+    "time_total": Metric("time_total", "total time", "s", "log"),
+    "time_run_per_state": Metric("time_run_per_state", "run time per state", "s", "log"),
+    "peak_rss": Metric("peak_rss", "peak RSS", "MB", "log", 1 / 1024**2),
+    "peak_malloc": Metric("peak_malloc", "peak malloc", "MB", "log", 1 / 1024**2),
+    "gbps": Metric("gbps", "effective bandwidth", "GB/s", "linear"),
+    "gflops": Metric("gflops", "effective GFLOP/s", "GFLOP/s", "linear"),
+}
+
+DEFAULT_METRICS = ("time_run", "peak_rss")
+
+
+def load_records(path: Path, hosts: Sequence[str] = (), runs: Sequence[str] = ()) -> List[dict]:
+    sys.path.insert(0, str(REPO))
+    from bench.store import ResultStore
+
+    filters = {"status": "ok"}
+    if hosts:
+        filters["host"] = list(hosts)
+    if runs:
+        filters["run_id"] = list(runs)
+    return list(ResultStore(path).records(**filters))
+
+
+def store_blocks(
+    records: Iterable[dict],
+    metrics: Sequence[str] = DEFAULT_METRICS,
+    label: Optional[str] = None,
+    dims: Optional[Sequence[int]] = None,
+) -> List[Tuple[str, PlotBlock]]:
+    """(file name, block) per host and metric; medians over repetitions."""
+    pattern = re.compile(label) if label else None
+    wanted = set(dims) if dims else None
+    values: Dict[Tuple[str, str], Dict[str, Dict[int, List[float]]]] = defaultdict(
+        lambda: defaultdict(lambda: defaultdict(list))
+    )
+    for r in records:
+        if pattern is not None and not pattern.search(r["label"]):
+            continue
+        if wanted is not None and r["dim"] not in wanted:
+            continue
+        for key in metrics:
+            metric = METRICS[key]
+            value = r.get(metric.field)
+            if value is not None:
+                values[r["host"], key][r["label"]][r["dim"]].append(value * metric.factor)
+
+    blocks = []
+    for (host, key), series in sorted(values.items()):
+        metric = METRICS[key]
+        labels = sorted(series)
+        xs = sorted({dim for s in series.values() for dim in s})
+        block = PlotBlock(
+            title=f"{metric.name} ({host})",
+            subtitle=f"median of {max(len(v) for s in series.values() for v in s.values())} run(s)",
+            y_name=metric.name,
+            y_unit=metric.unit,
+            y_scale=metric.scale,
+            x_label="DIM",
+            series_labels=labels,
+            x=xs,
+            ys={
+                lab: [float(np.median(series[lab][x])) if x in series[lab] else None for x in xs]
+                for lab in labels
+            },
+        )
+        safe_host = re.sub(r"[^A-Za-z0-9._-]+", "_", host)
+        blocks.append((f"{safe_host}_{key}.png", block))
+    return blocks
+
+
+def summary_blocks(path: Path) -> List[Tuple[str, PlotBlock]]:
+    return [(figure_name(b, idx), b) for idx, b in enumerate(parse_file(path), start=1)]
+
+
+# ============================
+# Scaling fits
+# ============================
+
+Curve = Tuple[List[int], List[float], List[float], List[float]]
+
+
+def fit_block(block: PlotBlock, model: str, until: Optional[int]) -> Dict[str, Tuple[object, Curve]]:
+    """Per series the fit and its (x, fitted, lower, upper) curve; series too short to fit are left out."""
+    sys.path.insert(0, str(REPO))
+    from bench.scaling import fit_model
+
+    result = {}
+    for label in block.series_labels:
+        try:
+            # memory has a constant interpreter / library baseline
+            f = fit_model(block.x, block.ys[label], model, offset=block.y_unit == "MB")
+        except ValueError:
+            continue
+        xs = list(range(min(f.dims), max(until or 0, max(f.dims)) + 1))
+        preds = [f.predict(x) for x in xs]
+        result[label] = (f, (xs, [p.value for p in preds], [p.lo for p in preds], [p.hi for p in preds]))
+    return result
+
+
+def write_fit_table(path: Path, blocks: List[Tuple[str, PlotBlock]], fits: List[Dict[str, Tuple[object, Curve]]]) -> None:
+    lines = ["figure\tseries\tmodel\tDIM\tmeasured\tpredicted\tlower\tupper\tunit"]
+    for (name, block), by_label in zip(blocks, fits):
+        for label, (f, (xs, ys, los, his)) in by_label.items():
+            measured = dict(zip(block.x, block.ys[label]))
+            for x, y, lo, hi in zip(xs, ys, los, his):
+                m = measured.get(x)
+                lines.append("\t".join([
+                    name, label, f.model, str(x), "" if m is None else f"{m:.6g}",
+                    f"{y:.6g}", f"{lo:.6g}", f"{hi:.6g}", block.y_unit,
+                ]))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n")
+
+
+# ============================
+# Rendering
+# ============================
+
+# suffix of the output directory -> (Y scale override, legend location)
+VARIANTS: Dict[str, Tuple[Optional[str], str]] = {
+    "": (None, "lower right"),
+    "_lin": ("linear", "upper left"),
+}
+
+
+@dataclass
+class Job:
+    block: PlotBlock
+    idx: int
+    path: Path
+    y_scale: Optional[str]
+    legend_loc: str
+    fits: Optional[Dict[str, Curve]] = None
+
+    @property
+    def digest(self) -> str:
+        payload = json.dumps(
+            [STYLE_VERSION, asdict(self.block), self.idx, self.y_scale, self.legend_loc, self.fits],
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _init_worker() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from plot_summary_results6 import set_presentation_style
+
+    set_presentation_style()
+
+
+def _render(job: Job) -> str:
+    import matplotlib.pyplot as plt
+    from plot_summary_results6 import render_block
+
+    fig = render_block(job.block, job.idx, job.y_scale, job.legend_loc, job.fits)
+    job.path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(job.path, dpi=150)
+    plt.close(fig)
+    return str(job.path)
+
+
+def _load_hashes(directory: Path) -> Dict[str, str]:
+    try:
+        return json.loads((directory / HASH_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def plan(
+    blocks: List[Tuple[str, PlotBlock]],
+    save_dir: Path,
+    fits: Optional[List[Dict[str, Curve]]] = None,
+) -> List[Job]:
+    jobs = []
+    for suffix, (y_scale, legend_loc) in VARIANTS.items():
+        directory = save_dir.with_name(save_dir.name + suffix)
+        for idx, (name, block) in enumerate(blocks, start=1):
+            curves = fits[idx - 1] if fits else None
+            jobs.append(Job(block, idx, directory / name, y_scale, legend_loc, curves))
+    return jobs
+
+
+def render(jobs: List[Job], workers: Optional[int] = None, force: bool = False) -> Tuple[int, int]:
+    """Render the jobs whose hash changed; (rendered, skipped)."""
+    hashes = {d: _load_hashes(d) for d in {job.path.parent for job in jobs}}
+    todo = [
+        job for job in jobs
+        if force or not job.path.exists() or hashes[job.path.parent].get(job.path.name) != job.digest
+    ]
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for job, path in zip(todo, pool.map(_render, todo)):
+                print(f"rendered {path}")
+                hashes[job.path.parent][job.path.name] = job.digest
+        for directory, entries in hashes.items():
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / HASH_FILE).write_text(json.dumps(entries, indent=1, sort_keys=True))
+    return len(todo), len(jobs) - len(todo)
+
+
+# ============================
+# CLI
+# ============================
+
+def parse_dims(spec: Optional[str]) -> Optional[List[int]]:
+    if not spec:
+        return None
+    dims: List[int] = []
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":")
+            dims.extend(range(int(lo), int(hi) + 1))
+        else:
+            dims.append(int(part))
+    return dims
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Render the log and linear plots of benchmark results.")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--store", default=str(REPO / "results" / "bench.jsonl"),
+                     help="Result store of python -m bench (default: results/bench.jsonl).")
+    src.add_argument("--summary", default=None,
+                     help="Plot the blocks of a summary_results.txt instead of the store.")
+    ap.add_argument("--save-dir", required=True,
+                    help="Output directory; the linear variant goes to <save-dir>_lin.")
+    ap.add_argument("--host", action="append", default=[], help="Only records of this host; repeatable.")
+    ap.add_argument("--run", action="append", default=[], help="Only records of this run id; repeatable.")
+    ap.add_argument("--label", default=None, help="Only labels matching this regular expression.")
+    ap.add_argument("--dims", default=None, help='Only these DIMs: "1:20" or "4,8,12".')
+    ap.add_argument("--metric", action="append", choices=sorted(METRICS),
+                    help=f"Metric to plot; repeatable (default: {', '.join(DEFAULT_METRICS)}).")
+    ap.add_argument("--fit", default=None, choices=("best", "exp", "nexp"),
+                    help="Overlay scaling-law fits with prediction intervals.")
+    ap.add_argument("--extrapolate", type=int, default=None, metavar="DIM",
+                    help="Draw the fits up to this DIM (default: the largest measured).")
+    ap.add_argument("--fit-table", default=None,
+                    help="Write the fitted / predicted values per series and DIM to this TSV file.")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores).")
+    ap.add_argument("--force", action="store_true", help="Redraw every figure.")
+    args = ap.parse_args(argv)
+
+    if args.summary:
+        path = Path(args.summary)
+        if not path.exists():
+            raise SystemExit(f"Input file not found: {path}")
+        blocks = summary_blocks(path)
+    else:
+        records = load_records(Path(args.store), args.host, args.run)
+        blocks = store_blocks(records, args.metric or DEFAULT_METRICS, args.label, parse_dims(args.dims))
+    if not blocks:
+        raise SystemExit("Nothing to plot.")
+
+    curves = None
+    if args.fit or args.fit_table:
+        fits = [fit_block(block, args.fit or "best", args.extrapolate) for _, block in blocks]
+        if args.fit_table:
+            write_fit_table(Path(args.fit_table), blocks, fits)
+            print(f"fit table written to {args.fit_table}")
+        if args.fit:
+            curves = [{label: curve for label, (_, curve) in by_label.items()} for by_label in fits]
+
+    rendered, skipped = render(plan(blocks, Path(args.save_dir), curves), args.jobs, args.force)
+    print(f"{rendered} figure(s) rendered, {skipped} unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,10 @@ Presentation/Beamer optimizations:
 - Discrete markers only (no lines)
 - Distinct color + marker per series (bounded, safe)
 - DIM (X axis) displayed as integer (no decimals)
+
+--linear renders the linear variant (formerly plot_summary_results6lin.py).
+plot_results.py renders both variants in one pass, in parallel, and also
+plots the benchmark result store.
 """
 
 from __future__ import annotations
@@ -245,76 +249,111 @@ def make_style_pairs(n: int) -> List[Tuple[object, str]]:
 # Plotting
 # ============================
 
-def plot_blocks(blocks: List[PlotBlock], save_dir: Optional[Path], show: bool) -> None:
+def figure_name(b: PlotBlock, idx: int) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", (b.title or f"plot_{idx}")).strip("_")
+    return f"{idx:02d}_{safe}.png"
+
+
+def render_block(
+    b: PlotBlock,
+    idx: int,
+    y_scale: Optional[str] = None,
+    legend_loc: str = "lower right",
+    fits: Optional[Dict[str, Tuple[List[int], List[float], List[float], List[float]]]] = None,
+):
+    """
+    One figure for block ``b``. ``y_scale`` overrides the scale given in
+    the block (the linear variant uses "linear" and "upper left").
+    ``fits`` maps series labels to (x, fitted, lower, upper) curves, drawn
+    as a line with a shaded interval in the series' color.
+    """
+    # 16:9 format: good default for slides
+    fig, ax = plt.subplots(figsize=(12.8, 7.2))
+
+    styles = make_style_pairs(len(b.series_labels))
+
+    for label, (color, marker) in zip(b.series_labels, styles):
+        xs, ys_vals = [], []
+        for x, y in zip(b.x, b.ys[label]):
+            if y is not None:
+                xs.append(x)
+                ys_vals.append(y)
+
+        if xs:
+            ax.plot(
+                xs,
+                ys_vals,
+                linestyle="dotted",
+                marker=marker,
+                color=color,
+                markersize=8,   # slightly larger for beamer
+                label=label,
+            )
+
+        if fits and label in fits:
+            fx, fy, flo, fhi = fits[label]
+            ax.plot(fx, fy, linestyle="solid", linewidth=1.2, color=color, alpha=0.8)
+            ax.fill_between(fx, flo, fhi, color=color, alpha=0.12, linewidth=0)
+
+    # Labels and scales
+    ax.set_xlabel(b.x_label)
+
+    ylab = (b.y_name or "").strip()
+    if (b.y_unit or "").strip():
+        ylab = f"{ylab} ({b.y_unit.strip()})" if ylab else f"({b.y_unit.strip()})"
+    ax.set_ylabel(ylab if ylab else "Y")
+
+    scale = y_scale or b.y_scale
+    ax.set_yscale(scale if scale in ("linear", "log") else "linear")
+
+    # DIM ticks: integer only
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda v, _: f"{int(v)}"))
+
+    # Title (big & readable)
+    full_title = (b.title or f"Plot {idx}").strip()
+    if (b.subtitle or "").strip():
+        full_title = f"{full_title}\n{b.subtitle.strip()}"
+    ax.set_title(full_title, pad=12)
+
+    ax.grid(True, which="both")
+
+    # Legend overlay: bigger and readable on beamer
+    ax.legend(
+        loc=legend_loc,
+        ncol=2,
+        fontsize=14,        # explicit: beamer readable
+        frameon=True,
+        framealpha=0.90,
+        borderpad=0.6,
+        labelspacing=0.4,
+        columnspacing=1.0,
+        handletextpad=0.6,
+        handlelength=1.3,
+        markerscale=1.2,    # legend markers a bit larger than plot markers
+    )
+
+    fig.tight_layout()
+    return fig
+
+
+def plot_blocks(
+    blocks: List[PlotBlock],
+    save_dir: Optional[Path],
+    show: bool,
+    linear: bool = False,
+) -> None:
     if save_dir is not None:
         save_dir.mkdir(parents=True, exist_ok=True)
 
     for idx, b in enumerate(blocks, start=1):
-        # 16:9 format: good default for slides
-        fig, ax = plt.subplots(figsize=(12.8, 7.2))
-
-        styles = make_style_pairs(len(b.series_labels))
-
-        for label, (color, marker) in zip(b.series_labels, styles):
-            xs, ys_vals = [], []
-            for x, y in zip(b.x, b.ys[label]):
-                if y is not None:
-                    xs.append(x)
-                    ys_vals.append(y)
-
-            if xs:
-                ax.plot(
-                    xs,
-                    ys_vals,
-                    linestyle="dotted",
-                    marker=marker,
-                    color=color,
-                    markersize=8,   # slightly larger for beamer
-                    label=label,
-                )
-
-        # Labels and scales
-        ax.set_xlabel(b.x_label)
-
-        ylab = (b.y_name or "").strip()
-        if (b.y_unit or "").strip():
-            ylab = f"{ylab} ({b.y_unit.strip()})" if ylab else f"({b.y_unit.strip()})"
-        ax.set_ylabel(ylab if ylab else "Y")
-
-        ax.set_yscale(b.y_scale if b.y_scale in ("linear", "log") else "linear")
-
-        # DIM ticks: integer only
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        ax.xaxis.set_major_formatter(FuncFormatter(lambda v, _: f"{int(v)}"))
-
-        # Title (big & readable)
-        full_title = (b.title or f"Plot {idx}").strip()
-        if (b.subtitle or "").strip():
-            full_title = f"{full_title}\n{b.subtitle.strip()}"
-        ax.set_title(full_title, pad=12)
-
-        ax.grid(True, which="both")
-
-        # Legend overlay: bigger and readable on beamer
-        ax.legend(
-            loc="lower right",
-            ncol=2,
-            fontsize=14,        # explicit: beamer readable
-            frameon=True,
-            framealpha=0.90,
-            borderpad=0.6,
-            labelspacing=0.4,
-            columnspacing=1.0,
-            handletextpad=0.6,
-            handlelength=1.3,
-            markerscale=1.2,    # legend markers a bit larger than plot markers
-        )
-
-        fig.tight_layout()
+        if linear:
+            fig = render_block(b, idx, y_scale="linear", legend_loc="upper left")
+        else:
+            fig = render_block(b, idx)
 
         if save_dir is not None:
-            safe = re.sub(r"[^A-Za-z0-9._-]+", "_", (b.title or f"plot_{idx}")).strip("_")
-            fig.savefig(save_dir / f"{idx:02d}_{safe}.png", dpi=150)
+            fig.savefig(save_dir / figure_name(b, idx), dpi=150)
 
         if show:
             plt.show()
@@ -331,6 +370,8 @@ def main() -> None:
     ap.add_argument("file", nargs="?", default="summary_results.txt")
     ap.add_argument("--save-dir", default=None, help="Save PNGs into this directory.")
     ap.add_argument("--no-show", action="store_true", help="Do not open interactive windows.")
+    ap.add_argument("--linear", action="store_true",
+                    help="Force a linear Y axis (legend upper left) instead of the block's scale.")
     args = ap.parse_args()
 
     set_presentation_style()
@@ -344,7 +385,7 @@ def main() -> None:
         raise SystemExit("No valid plot blocks found in file.")
 
     save_dir = Path(args.save_dir) if args.save_dir else None
-    plot_blocks(blocks, save_dir=save_dir, show=(not args.no_show))
+    plot_blocks(blocks, save_dir=save_dir, show=(not args.no_show), linear=args.linear)
 
 
 if __name__ == "__main__":
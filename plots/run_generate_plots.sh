@@ -1,4 +1,11 @@
 #!/bin/bash
 source ~/.venv_q/bin/activate
-python plot_summary_results6.py summary_results.txt --no-show --save-dir plots6a
-python plot_summary_results6lin.py summary_results.txt --no-show --save-dir plots6a_lin
+cd "$(dirname "$0")"
+# log variant into plots6a, linear variant into plots6a_lin, unchanged figures are skipped
+python plot_results.py --summary summary_results.txt --save-dir plots6a
+# figures of the benchmark result store (python -m bench run), if there is one
+if [ -f ../results/bench.jsonl ]; then
+    python plot_results.py --store ../results/bench.jsonl --save-dir plots_bench
+fi
+# scaling-law fits extrapolated to 34 qubits, plus the table of predicted time / memory
+python plot_results.py --summary summary_results.txt --save-dir plots6a_fit --fit best --extrapolate 34 --fit-table predictions.tsv
@@ -1,17 +1,23 @@
 import time
 import gc
 import csv
+import json
 import argparse
 import tracemalloc
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 import multiprocessing as mp
+from functools import partial
 from contextlib import contextmanager
+from bench.environment import capture, describe
+from bench.states import StateProvider
+from python_sim.instrument import PHASES, profiled
 from python_sim import (
     QFT, SQFT, IQFT,
-    QFTS, SQFTS, IQFTS, 
-    QFTN, SQFTN, IQFTN, 
+    QFTS, SQFTS, IQFTS,
+    SQFTV, SQFTR,
+    # QFTN, SQFTN, IQFTN,  (numba, see numba_methods)
 )
 
 pd.set_option(
@@ -41,6 +47,13 @@ def run_with_peak(func, *args, **kwargs):
     p.join()
     return peak
 
+def profiled_columns():
+    return [
+        f'{phase}_{unit}'
+        for phase in PHASES
+        for unit in ('s', 'result_bytes', 'calls')
+    ]
+
 def format_bytes(x):
     if pd.isna(x):
         return ""
@@ -50,23 +63,30 @@ def format_bytes(x):
         x /= 1024
     return f"{x:.2f} EB"
 
-def create_random_state(dim: int) -> np.ndarray:
-    real = np.random.normal(size=2**dim)
-    imag = np.random.normal(size=2**dim)
-    v = real + 1j * imag
-    v /= np.linalg.norm(v)
-    return v
-
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("-n", "--num-qbits", 
         help="maximal number of qbits to use", 
         required=True
     )
+    parser.add_argument("-m", "--min-qbits", type=int, default=1,
+        help="minimal number of qbits to use (e.g. 20 to compare the stacked engines)"
+    )
     parser.add_argument("-d", "--num-dense",
         help="maximal number of qbits for dense runs"
     )
+    parser.add_argument("-s", "--num-sparse",
+        help="maximal number of qbits for sparse runs"
+    )
+    parser.add_argument("--seed", type=int, default=0,
+        help="seed of the random input states"
+    )
+    parser.add_argument("--state-dir",
+        help="input state cache (default: $QFT_STATE_DIR or results/states)"
+    )
+    parser.add_argument("--phases", action="store_true",
+        help="add per-phase time/result size/calls columns (operator, apply)"
+    )
     args = parser.parse_args()
 
     max_qbits = int(args.num_qbits)
@@ -74,15 +94,18 @@ if __name__ == '__main__':
         max_dense = int(args.num_dense)
     else:
         max_dense = max_qbits
-    dims = list(range(1, max_qbits+1))
+    max_sparse = int(args.num_sparse) if args.num_sparse else max_qbits
+    dims = list(range(args.min_qbits, max_qbits+1))
+    states = StateProvider(args.seed, args.state_dir)
     dense_methods = {
         'QFT': QFT, 
         'SQFT': SQFT, 
         # 'IQFT': IQFT
     }
+    # numba engines are only imported (numba + LLVM init) when enabled here
     numba_methods = {
-        'QFTN': QFTN, 
-        'SQFTN': SQFTN, 
+        # 'QFTN': QFTN,
+        # 'SQFTN': SQFTN,
         # 'IQFTN': IQFTN
     }
     sparse_methods = {
@@ -90,10 +113,17 @@ if __name__ == '__main__':
         'SQFTS': SQFTS,
         # 'IQFTS': IQFTS
     }
+    # vectorized stacked engine, one qubit (radix 2) or 2 / 3 qubits per pass
+    vec_methods = {
+        'SQFTV': SQFTV,
+        'SQFTR4': partial(SQFTR, radix=4),
+        'SQFTR8': partial(SQFTR, radix=8),
+    }
     methods = {
         **dense_methods,
         # **numba_methods,
-        **sparse_methods
+        **sparse_methods,
+        **vec_methods
     }
 
     times = pd.DataFrame(
@@ -108,32 +138,57 @@ if __name__ == '__main__':
 
     mems.style.format(format_bytes, subset=mems.select_dtypes("number").columns)
 
+    all_methods = list(methods.keys())
+    phase_columns = [
+        f'{key}_{column}'
+        for key in all_methods
+        for column in profiled_columns()
+    ] if args.phases else []
+
+    # one line per run; the ENV column of the CSV rows links them to it
+    env = capture()
+    print(describe(env))
+    with open('python_results_env.jsonl', 'a') as f:
+        f.write(json.dumps({'timestamp': time.time(), **env}) + '\n')
+
     with open('python_results.csv', 'a', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(['DIM'] + list(methods.keys()) + list(methods.keys()))
+        writer.writerow(['ENV', 'DIM'] + all_methods + all_methods + phase_columns)
 
     try:
         for dim in tqdm(dims):
-            state = create_random_state(dim)
+            state = np.array(states.get(dim))
 
             temp_times = {}
             temp_mems = {}
-            method_iter = tqdm(methods.items(), leave=False)
+            temp_phases = {}
+            active = {
+                **(dense_methods if dim <= max_dense else {}),
+                **(sparse_methods if dim <= max_sparse else {}),
+                **vec_methods
+            }
+            method_iter = tqdm(active.items(), leave=False)
             for key, method in method_iter:
-                start = time.process_time()
-                method(state.copy())
-                end = time.process_time()
+                with profiled(args.phases) as profile:
+                    start = time.process_time()
+                    method(state.copy())
+                    end = time.process_time()
                 temp_times[key] = end - start
                 temp_mems[key] = run_with_peak(method, state.copy())
+                if profile is not None:
+                    for column, value in profile.as_dict().items():
+                        temp_phases[f'{key}_{column}'] = value
 
             times.loc[dim] = temp_times
             mems.loc[dim] = temp_mems
             with open('python_results.csv', 'a', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow([dim] + list(temp_times.values()) + list(temp_mems.values()))
-
-            if dim == max_dense:
-                methods = sparse_methods
+                writer.writerow(
+                    [env['env_id'], dim]
+                    + [temp_times.get(key, '') for key in all_methods]
+                    + [temp_mems.get(key, '') for key in all_methods]
+                    + [temp_phases.get(column, '') for column in phase_columns]
+                )
     except KeyboardInterrupt:
         pass
 
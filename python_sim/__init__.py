@@ -1,9 +1,35 @@
-from .qft import QFT, SQFT, IQFT
-from .qft_sparse import QFTS, SQFTS, IQFTS
-from .qft_numba import QFTN, SQFTN, IQFTN
+import importlib
+from typing import Any, List
+
+# The engines are imported on first access (module level __getattr__), so
+# `import python_sim` stays cheap: qft_sparse pulls in scipy.sparse and
+# qft_numba numba and LLVM, which scripts that only use the dense engines
+# should not pay for.
+
+_ENGINES = {
+  'QFT':   'qft',         'SQFT':  'qft',         'IQFT':  'qft',
+  'QFTS':  'qft_sparse',  'SQFTS': 'qft_sparse',  'IQFTS': 'qft_sparse',
+  'QFTN':  'qft_numba',   'SQFTN': 'qft_numba',   'IQFTN': 'qft_numba',
+  'SQFTV': 'qft_vec',     'SQFTR': 'qft_vec',
+  'SQFTD': 'distributed',
+}
 
 __all__ = [
-    'QFT',  'SQFT',  'IQFT',
-    'QFTS', 'SQFTS', 'IQFTS'
-    'QFTN', 'SQFTN', 'IQFTN'
+  'QFT',  'SQFT',  'IQFT',
+  'QFTS', 'SQFTS', 'IQFTS',
+  'QFTN', 'SQFTN', 'IQFTN',
+  'SQFTV', 'SQFTR', 'SQFTD',
 ]
+
+def __getattr__(name: str) -> Any:
+  module = _ENGINES.get(name)
+  if module is None:
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+  value = getattr(importlib.import_module(f'.{module}', __name__), name)
+  globals()[name] = value
+  return value
+
+def __dir__() -> List[str]:
+  return sorted(set(globals()) | set(__all__))
+
+# vim:ts=2 sw=2 et:
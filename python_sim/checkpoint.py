@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+###################
+### Checkpoints ###
+###################
+
+# Stage-level checkpoints of long runs. A checkpoint directory holds the
+# state after the last completed stage as a stream of independently
+# compressed chunks (state.bin: [8 byte length][payload] frames) plus
+# meta.json, which is written last, so a checkpoint only counts once it is
+# complete. A new checkpoint is streamed into state.tmp and swapped in with
+# os.replace, so the previous one survives a crash while writing.
+#
+# Writes run on one background thread, in order. The caller must not modify
+# a state it handed to save() before the returned future is done; the
+# stacked engines use two buffers in turns, so the next stage computes while
+# the previous one is being written.
+#
+# A checkpoint belongs to one input: the engines store ``digest(input)`` in
+# its meta and only resume from a checkpoint with the same digest. A run
+# that finishes clears its checkpoint, so it is never resumed.
+
+FORMAT_VERSION = 1
+
+DEFAULT_CHUNK = 1 << 22     # amplitudes per compressed frame (64 MiB)
+
+##############
+### Codecs ###
+##############
+
+def _zstd() -> Tuple[Callable, Callable]:
+  import zstandard
+  return zstandard.ZstdCompressor(level=1).compress, zstandard.ZstdDecompressor().decompress
+
+def _lz4() -> Tuple[Callable, Callable]:
+  import lz4.frame
+  return lz4.frame.compress, lz4.frame.decompress
+
+def _zlib() -> Tuple[Callable, Callable]:
+  return (lambda data: zlib.compress(data, 1)), zlib.decompress
+
+def _raw() -> Tuple[Callable, Callable]:
+  return bytes, bytes
+
+CODECS: Dict[str, Callable[[], Tuple[Callable, Callable]]] = {
+  'zstd': _zstd,
+  'lz4': _lz4,
+  'zlib': _zlib,
+  'raw': _raw,
+}
+
+def get_codec(name: str = 'auto') -> Tuple[str, Callable, Callable]:
+  """(name, compress, decompress); ``auto`` picks zstd, lz4 or zlib, whichever is installed."""
+  names = ('zstd', 'lz4', 'zlib') if name == 'auto' else (name,)
+  for candidate in names:
+    if candidate not in CODECS:
+      raise ValueError(f'unknown codec {candidate!r} (choose from auto, {", ".join(CODECS)})')
+    try:
+      return (candidate, *CODECS[candidate]())
+    except ImportError:
+      if name != 'auto':
+        raise
+  raise RuntimeError('no checkpoint codec available')
+
+def digest(state: np.ndarray, chunk: int = DEFAULT_CHUNK) -> str:
+  """sha256 of the shape, dtype and all amplitudes of ``state``, hashed chunk by chunk."""
+  flat = state.reshape(-1)
+  h = hashlib.sha256(f'{state.shape}:{state.dtype}'.encode())
+  for start in range(0, len(flat), chunk):
+    h.update(memoryview(np.ascontiguousarray(flat[start:start + chunk])).cast('B'))
+  return h.hexdigest()
+
+##################
+### Checkpoint ###
+##################
+
+class Checkpoint:
+  """
+  Checkpoints of one run in ``path``. ``save(stage, state)`` queues the
+  state after ``stage`` for the background writer, ``wants(stage)`` tells
+  whether ``stage`` is one of every ``every`` stages to keep, ``load()``
+  returns the last complete checkpoint.
+  """
+
+  def __init__(
+    self,
+    path: Union[str, Path],
+    codec: str = 'auto',
+    every: int = 1,
+    chunk: int = DEFAULT_CHUNK,
+  ):
+    self.path = Path(path)
+    self.codec, self._compress, _ = get_codec(codec)
+    self.every = max(int(every), 1)
+    self.chunk = chunk
+    self.bytes_written = 0
+    self._executor: Optional[ThreadPoolExecutor] = None
+    self._pending: List[Future] = []
+
+  def wants(self, stage: int) -> bool:
+    return (stage + 1) % self.every == 0
+
+  def save(self, stage: int, state: np.ndarray, **meta: Any) -> Future:
+    """
+    Write ``state`` (completed ``stage``) in the background. ``state`` must
+    stay untouched until the returned future is done.
+    """
+    if self._executor is None:
+      self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint')
+    # surface errors of earlier writes instead of silently losing checkpoints
+    for future in [f for f in self._pending if f.done()]:
+      self._pending.remove(future)
+      future.result()
+    future = self._executor.submit(self._write, stage, state, meta)
+    self._pending.append(future)
+    return future
+
+  def wait(self) -> None:
+    """Block until every queued checkpoint is on disk."""
+    pending, self._pending = self._pending, []
+    for future in pending:
+      future.result()
+
+  def close(self) -> None:
+    try:
+      self.wait()
+    finally:
+      if self._executor is not None:
+        self._executor.shutdown()
+        self._executor = None
+
+  def __enter__(self) -> 'Checkpoint':
+    return self
+
+  def __exit__(self, *exc) -> None:
+    self.close()
+
+  def _write(self, stage: int, state: np.ndarray, meta: Dict[str, Any]) -> None:
+    self.path.mkdir(parents=True, exist_ok=True)
+    flat = state.reshape(-1)
+    tmp = self.path / 'state.tmp'
+    with open(tmp, 'wb') as f:
+      for start in range(0, len(flat), self.chunk):
+        data = memoryview(np.ascontiguousarray(flat[start:start + self.chunk])).cast('B')
+        payload = self._compress(data)
+        f.write(struct.pack('<Q', len(payload)))
+        f.write(payload)
+        self.bytes_written += 8 + len(payload)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp, self.path / 'state.bin')
+    info = {
+      'version': FORMAT_VERSION,
+      'stage': stage,
+      'shape': list(state.shape),
+      'dtype': str(state.dtype),
+      'codec': self.codec,
+      'chunk': self.chunk,
+      **meta,
+    }
+    tmp = self.path / 'meta.tmp'
+    tmp.write_text(json.dumps(info))
+    os.replace(tmp, self.path / 'meta.json')
+
+  def meta(self) -> Optional[Dict[str, Any]]:
+    try:
+      info = json.loads((self.path / 'meta.json').read_text())
+    except (OSError, ValueError):
+      return None
+    return info if info.get('version') == FORMAT_VERSION else None
+
+  def load(self) -> Optional[Tuple[int, np.ndarray, Dict[str, Any]]]:
+    """(last completed stage, state, meta), or None without a usable checkpoint."""
+    info = self.meta()
+    if info is None:
+      return None
+    _, _, decompress = get_codec(info['codec'])
+    state = np.empty(int(np.prod(info['shape'])), dtype=info['dtype'])
+    view = memoryview(state).cast('B')
+    offset = 0
+    with open(self.path / 'state.bin', 'rb') as f:
+      while offset < len(view):
+        size, = struct.unpack('<Q', f.read(8))
+        data = decompress(f.read(size))
+        view[offset:offset + len(data)] = data
+        offset += len(data)
+    return info['stage'], state.reshape(info['shape']), info
+
+  def clear(self) -> None:
+    for name in ('meta.json', 'state.bin', 'state.tmp', 'meta.tmp'):
+      (self.path / name).unlink(missing_ok=True)
+
+# vim:ts=2 sw=2 et:
@@ -0,0 +1,459 @@
+import argparse
+import multiprocessing as mp
+import socket
+import struct
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from queue import Empty
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .qft_vec import SQFTV, rotations, stage
+from .twiddle import twiddles
+
+###################
+### Distributed ###
+###################
+
+# Stacked QFT (SQFTV) with the amplitudes split over P = 2^k ranks.
+#
+# Stage i of the stacked QFT mixes the two halves of qubit i and multiplies
+# the |1> half with phases that depend on qubits 0..i-1 only. Stages whose
+# target is local to every rank need no communication; phases of global
+# qubits are scalars known from the rank id. The stages run MSB first, so:
+#
+# 1. ranks start in a strided layout: rank r holds the amplitudes whose low
+#    k qubits equal r (state[r::P]) and runs stages 0..n-k-1 locally,
+# 2. one all-to-all transpose swaps the top k and the low k qubits: rank r
+#    now holds the contiguous block r (top k qubits = r), which needs n >= 2k,
+# 3. stages n-k..n-1 run locally again.
+#
+# The result is the swapped-order transform split into contiguous blocks by
+# the top k qubits. Every rank reports its compute and communication time.
+
+DEFAULT_RANKS = 4
+
+# largest single pipe message; bigger chunks are split
+MESSAGE_BYTES = 1 << 28
+
+# how often SQFTD checks for ranks that died without reporting
+POLL_S = 1.0
+
+##################
+### Transports ###
+##################
+
+class Transport:
+  """
+  Point-to-point exchange of complex arrays between ranks. ``alltoall``
+  runs P-1 pairwise steps (partner = rank XOR step); the lower rank of a
+  pair sends first, so blocking transports cannot deadlock.
+  """
+
+  name = ''
+
+  def __init__(self, rank: int, size: int):
+    self.rank = rank
+    self.size = size
+    self.bytes_sent = 0
+
+  def send(self, dest: int, data: np.ndarray) -> None:
+    raise NotImplementedError
+
+  def recv(self, src: int, count: int) -> np.ndarray:
+    raise NotImplementedError
+
+  def alltoall(self, chunks: Sequence[np.ndarray]) -> List[np.ndarray]:
+    """Send ``chunks[s]`` to rank s; element s of the result came from rank s."""
+    received: List[Optional[np.ndarray]] = [None] * self.size
+    received[self.rank] = chunks[self.rank]
+    for step in range(1, self.size):
+      partner = self.rank ^ step
+      count = len(chunks[partner])
+      if self.rank < partner:
+        self.send(partner, chunks[partner])
+        received[partner] = self.recv(partner, count)
+      else:
+        received[partner] = self.recv(partner, count)
+        self.send(partner, chunks[partner])
+    return received
+
+  def close(self) -> None:
+    pass
+
+class PipeTransport(Transport):
+  """``multiprocessing`` pipes, one per pair of ranks (local only)."""
+
+  name = 'pipe'
+
+  def __init__(self, rank: int, size: int, conns: Dict[int, Any]):
+    super().__init__(rank, size)
+    self.conns = conns
+
+  def send(self, dest: int, data: np.ndarray) -> None:
+    view = memoryview(np.ascontiguousarray(data)).cast('B')
+    for start in range(0, len(view), MESSAGE_BYTES):
+      self.conns[dest].send_bytes(view[start:start + MESSAGE_BYTES])
+    self.bytes_sent += len(view)
+
+  def recv(self, src: int, count: int) -> np.ndarray:
+    data = np.empty(count, dtype=complex)
+    view = memoryview(data).cast('B')
+    received = 0
+    while received < len(view):
+      received += self.conns[src].recv_bytes_into(view, received)
+    return data
+
+  def close(self) -> None:
+    for conn in self.conns.values():
+      conn.close()
+
+class SocketTransport(Transport):
+  """
+  TCP sockets, one per pair of ranks; works between nodes. Rank r listens
+  on ``addresses[r]`` (or on an already bound ``listener``), connects to
+  all lower ranks and accepts the higher ones.
+  """
+
+  name = 'socket'
+
+  def __init__(
+    self,
+    rank: int,
+    size: int,
+    addresses: Sequence[Tuple[str, int]],
+    listener: Optional[socket.socket] = None,
+    timeout: float = 60.0,
+  ):
+    super().__init__(rank, size)
+    if listener is None:
+      listener = socket.create_server(addresses[rank])
+    self.socks: Dict[int, socket.socket] = {}
+    for peer in range(rank):
+      deadline = time.monotonic() + timeout
+      while True:
+        try:
+          sock = socket.create_connection(addresses[peer])
+          break
+        except OSError:
+          if time.monotonic() > deadline:
+            raise
+          time.sleep(0.05)
+      sock.sendall(struct.pack('!I', rank))
+      self.socks[peer] = sock
+    listener.listen(size)
+    for _ in range(rank + 1, size):
+      sock, _ = listener.accept()
+      peer, = struct.unpack('!I', self._read(sock, 4))
+      self.socks[peer] = sock
+    listener.close()
+    for sock in self.socks.values():
+      sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+  @staticmethod
+  def _read(sock: socket.socket, nbytes: int) -> bytes:
+    data = bytearray(nbytes)
+    view = memoryview(data)
+    while view:
+      n = sock.recv_into(view)
+      if n == 0:
+        raise ConnectionError('peer closed the connection')
+      view = view[n:]
+    return bytes(data)
+
+  def send(self, dest: int, data: np.ndarray) -> None:
+    view = memoryview(np.ascontiguousarray(data)).cast('B')
+    self.socks[dest].sendall(view)
+    self.bytes_sent += len(view)
+
+  def recv(self, src: int, count: int) -> np.ndarray:
+    data = np.empty(count, dtype=complex)
+    view = memoryview(data).cast('B')
+    while view:
+      n = self.socks[src].recv_into(view)
+      if n == 0:
+        raise ConnectionError('peer closed the connection')
+      view = view[n:]
+    return data
+
+  def close(self) -> None:
+    for sock in self.socks.values():
+      sock.close()
+
+class SharedMemoryTransport(Transport):
+  """
+  One shared exchange buffer of P x P slots (local only): every rank writes
+  its outgoing chunks into its row, waits at a barrier and reads its column.
+  """
+
+  name = 'shm'
+
+  def __init__(self, rank: int, size: int, buffer_name: str, slot: int, barrier: Any):
+    super().__init__(rank, size)
+    self.shm = shared_memory.SharedMemory(name=buffer_name)
+    self.slots = np.ndarray((size, size, slot), dtype=complex, buffer=self.shm.buf)
+    self.barrier = barrier
+
+  def alltoall(self, chunks: Sequence[np.ndarray]) -> List[np.ndarray]:
+    for dest, chunk in enumerate(chunks):
+      self.slots[self.rank, dest] = chunk
+      if dest != self.rank:
+        self.bytes_sent += chunk.nbytes
+    self.barrier.wait()
+    received = [self.slots[src, self.rank].copy() for src in range(self.size)]
+    # nobody may overwrite a slot before everybody has read it
+    self.barrier.wait()
+    return received
+
+  def close(self) -> None:
+    del self.slots
+    self.shm.close()
+
+TRANSPORTS = ('pipe', 'shm', 'socket')
+
+#############
+### Ranks ###
+#############
+
+def min_dim(size: int) -> int:
+  """Fewest qubits ``size`` ranks can transform (the transpose needs n >= 2k)."""
+  return 2 * (size.bit_length() - 1)
+
+def check_layout(dim: int, size: int) -> int:
+  """k = log2(size); raises if the ranks do not fit the transpose."""
+  k = size.bit_length() - 1
+  if size < 1 or 1 << k != size:
+    raise ValueError(f'number of ranks must be a power of two, got {size}')
+  if dim < min_dim(size):
+    raise ValueError(f'{size} ranks need at least {min_dim(size)} qubits, got {dim}')
+  return k
+
+def rank_qft(
+  local: np.ndarray,
+  dim: int,
+  transport: Transport,
+) -> Tuple[np.ndarray, Dict[str, float]]:
+  """
+  The part of rank ``transport.rank``: ``local`` is its strided input slice
+  (modified in place), the result is its contiguous output block.
+  """
+  rank, size = transport.rank, transport.size
+  k = check_layout(dim, size)
+  stats = {'compute_s': 0.0, 'comm_s': 0.0}
+
+  # strided layout: qubits 0..dim-k-1 local, dim-k..dim-1 given by the rank
+  start = time.perf_counter()
+  for target, rots in zip(range(dim - k), twiddles().stages(0, dim - k)):
+    stage(local, target, rots)
+  stats['compute_s'] += time.perf_counter() - start
+
+  # transpose: the chunk for rank s holds its top k qubits = s
+  start = time.perf_counter()
+  received = transport.alltoall(np.split(local, size))
+  block = np.empty_like(local)
+  columns = block.reshape(-1, size)
+  for src, chunk in enumerate(received):
+    columns[:, src] = chunk
+  del received, columns
+  stats['comm_s'] += time.perf_counter() - start
+
+  # block layout: qubits 0..k-1 given by the rank, k..dim-1 local
+  start = time.perf_counter()
+  for target in range(dim - k, dim):
+    stage(block, target - k, rotations(target, k, rank))
+  stats['compute_s'] += time.perf_counter() - start
+
+  stats['bytes_sent'] = transport.bytes_sent
+  return block, stats
+
+def _local_transports(kind: str, size: int, ctx: Any, nbytes: int) -> Tuple[Callable, Callable]:
+  """Transport factory for forked local ranks and its cleanup."""
+  if kind == 'pipe':
+    conns: List[Dict[int, Any]] = [{} for _ in range(size)]
+    for a in range(size):
+      for b in range(a + 1, size):
+        conns[a][b], conns[b][a] = ctx.Pipe()
+    def cleanup() -> None:
+      for peers in conns:
+        for conn in peers.values():
+          conn.close()
+    return (lambda rank: PipeTransport(rank, size, conns[rank])), cleanup
+  if kind == 'shm':
+    buffer = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    barrier = ctx.Barrier(size)
+    slot = nbytes // 16 // size // size
+    def cleanup() -> None:
+      buffer.close()
+      buffer.unlink()
+    return (lambda rank: SharedMemoryTransport(rank, size, buffer.name, slot, barrier)), cleanup
+  if kind == 'socket':
+    # bound before forking, so no rank can connect to a port that is not listening yet
+    listeners = [socket.create_server(('127.0.0.1', 0)) for _ in range(size)]
+    addresses = [l.getsockname()[:2] for l in listeners]
+    def cleanup() -> None:
+      for l in listeners:
+        l.close()
+    return (lambda rank: SocketTransport(rank, size, addresses, listeners[rank])), cleanup
+  raise ValueError(f'unknown transport {kind!r} (choose from {", ".join(TRANSPORTS)})')
+
+def _rank_main(make_transport, rank, size, dim, state, out_name, queue) -> None:
+  try:
+    transport = make_transport(rank)
+    try:
+      start = time.perf_counter()
+      local = np.array(state[rank::size], dtype=complex)
+      load = time.perf_counter() - start
+      block, stats = rank_qft(local, dim, transport)
+    finally:
+      transport.close()
+    stats.update(rank=rank, load_s=load)
+    shm = shared_memory.SharedMemory(name=out_name)
+    out = np.ndarray((2 ** dim,), dtype=complex, buffer=shm.buf)
+    out[rank * len(block):(rank + 1) * len(block)] = block
+    del out
+    shm.close()
+    queue.put(stats)
+  except BaseException as e:
+    queue.put({'rank': rank, 'error': f'{type(e).__name__}: {e}'})
+
+def _collect(queue: Any, procs: Sequence[Any]) -> List[Dict[str, Any]]:
+  """One report per rank, sorted by rank; raises if a rank exits without one."""
+  results: Dict[int, Dict[str, Any]] = {}
+  while len(results) < len(procs):
+    try:
+      report = queue.get(timeout=POLL_S)
+    except Empty:
+      dead = [r for r, p in enumerate(procs) if p.exitcode is not None and r not in results]
+      if not dead:
+        continue
+      # a rank's last report may arrive just after its exit was noticed
+      try:
+        while True:
+          report = queue.get(timeout=POLL_S)
+          results[report['rank']] = report
+      except Empty:
+        pass
+      dead = [r for r in dead if r not in results]
+      if dead:
+        raise RuntimeError(', '.join(
+          f'rank {r} exited with code {procs[r].exitcode} without a result' for r in dead
+        ))
+      continue
+    results[report['rank']] = report
+  return [results[r] for r in sorted(results)]
+
+def SQFTD(
+  state: np.ndarray,
+  ranks: int = DEFAULT_RANKS,
+  transport: str = 'pipe',
+  stats: Optional[List[Dict[str, float]]] = None,
+) -> np.ndarray:
+  """
+  SQFTV on ``ranks`` local processes exchanging data over ``transport``
+  (pipe, shm or socket). Per-rank timings are appended to ``stats``.
+  """
+  shape = state.shape
+  x = np.asarray(state).reshape(-1)
+  dim = int(np.log2(len(state)))
+  if x.size != 2 ** dim:
+    raise ValueError('SQFTD transforms a single state, not a batch')
+  check_layout(dim, ranks)
+  if ranks == 1:
+    return SQFTV(state)
+
+  ctx = mp.get_context('fork')
+  nbytes = 16 * len(x)
+  make_transport, cleanup = _local_transports(transport, ranks, ctx, nbytes)
+  out = shared_memory.SharedMemory(create=True, size=nbytes)
+  queue = ctx.Queue()
+  procs = [
+    ctx.Process(target=_rank_main, args=(make_transport, r, ranks, dim, x, out.name, queue))
+    for r in range(ranks)
+  ]
+  try:
+    for p in procs:
+      p.start()
+    results = _collect(queue, procs)
+    for p in procs:
+      p.join()
+    errors = [f"rank {s['rank']}: {s['error']}" for s in results if 'error' in s]
+    if errors:
+      raise RuntimeError('; '.join(errors))
+    result = np.ndarray((len(x),), dtype=complex, buffer=out.buf).copy()
+  finally:
+    for p in procs:
+      if p.is_alive():
+        p.terminate()
+    out.close()
+    out.unlink()
+    cleanup()
+  if stats is not None:
+    stats.extend(results)
+  return result.reshape(shape) # NOTE: swapped bit order now
+
+###########
+### CLI ###
+###########
+
+def _report(stats: List[Dict[str, float]]) -> None:
+  for s in stats:
+    print(
+      f"rank {s['rank']} ... compute {s['compute_s']:.3f}s ... comm {s['comm_s']:.3f}s "
+      f"... {s['bytes_sent']/1024**2:.1f}MB sent"
+    )
+  compute = max(s['compute_s'] for s in stats)
+  comm = max(s['comm_s'] for s in stats)
+  print(f"max ... compute {compute:.3f}s ... comm {comm:.3f}s ... comm share {comm / (compute + comm):.1%}")
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  parser = argparse.ArgumentParser(
+    description='Distributed stacked QFT. Without --rank all ranks run as local '
+                'processes; with --rank one rank of a multi-node run is started.'
+  )
+  parser.add_argument('-n', '--dim', type=int, default=20, help='number of qubits')
+  parser.add_argument('-p', '--ranks', type=int, default=DEFAULT_RANKS, help='number of ranks (power of two)')
+  parser.add_argument('-t', '--transport', choices=TRANSPORTS, default='pipe')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--rank', type=int, help='run only this rank (socket transport)')
+  parser.add_argument('--hosts', help='host:port of every rank, comma separated')
+  parser.add_argument('--input', help='.npy input state (memory mapped, each rank reads its slice)')
+  parser.add_argument('--output', help='output prefix; rank r writes <prefix>.rank<r>.npy')
+  args = parser.parse_args(argv)
+
+  if args.rank is None:
+    rng = np.random.default_rng(args.seed)
+    N = 2 ** args.dim
+    state = np.load(args.input, mmap_mode='r') if args.input else \
+      rng.standard_normal(2 * N).view(complex) / np.sqrt(2 * N)
+    stats: List[Dict[str, float]] = []
+    start = time.perf_counter()
+    result = SQFTD(state, args.ranks, args.transport, stats)
+    print(f'n={args.dim} ranks={args.ranks} transport={args.transport} ... {time.perf_counter() - start:.3f}s')
+    _report(stats)
+    error = np.abs(result - SQFTV(np.asarray(state))).max()
+    print(f'max |error| vs SQFTV {error:.3e}')
+    return 0 if error < 1e-8 else 1
+
+  if not (args.hosts and args.input):
+    parser.error('--rank needs --hosts and --input')
+  addresses = [(h, int(p)) for h, p in (a.rsplit(':', 1) for a in args.hosts.split(','))]
+  state = np.load(args.input, mmap_mode='r')
+  dim = int(np.log2(len(state)))
+  transport = SocketTransport(args.rank, len(addresses), addresses)
+  try:
+    start = time.perf_counter()
+    local = np.array(state[args.rank::len(addresses)], dtype=complex)
+    load = time.perf_counter() - start
+    block, stats = rank_qft(local, dim, transport)
+  finally:
+    transport.close()
+  stats.update(rank=args.rank, load_s=load)
+  if args.output:
+    np.save(f'{args.output}.rank{args.rank}.npy', block)
+  _report([stats])
+  return 0
+
+if __name__ == '__main__':
+  raise SystemExit(main())
+
+# vim:ts=2 sw=2 et:
@@ -0,0 +1,136 @@
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
+from typing import List, Sequence, Union
+
+######################
+### Kron Operators ###
+######################
+
+# kron(f_0, ..., f_{n-1}) of 2x2 factors as a LinearOperator that never
+# materialises the 2^n x 2^n product. A matvec views the vector as an
+# n-dimensional 2x2x...x2 tensor (qubit 0 = axis 0 = most significant bit)
+# and contracts every non-identity factor with its own axis: O(2^n) memory
+# and 4 * 2^n multiply-adds per factor instead of 4^n. Sums of such
+# products (controlled gates: kron(..M00..) + kron(..M11..)) are a KronSum.
+# PermScale is the single-gate case the sparse engine uses for its layers.
+
+I2 = np.eye(2, dtype=complex)
+
+def _contract(tensor: np.ndarray, factor: np.ndarray, axis: int) -> np.ndarray:
+  return np.moveaxis(np.tensordot(factor, tensor, axes=([1], [axis])), 0, axis)
+
+class KronOperator(LinearOperator):
+  def __init__(self, factors: Sequence[np.ndarray]):
+    self.factors = [np.asarray(f, dtype=complex) for f in factors]
+    # (axis, factor) of the factors that are not the identity
+    self.active = [
+      (axis, f) for axis, f in enumerate(self.factors)
+      if not np.array_equal(f, I2)
+    ]
+    N = 2 ** len(self.factors)
+    super().__init__(dtype=np.dtype(complex), shape=(N, N))
+
+  @property
+  def nbytes(self) -> int:
+    return sum(f.nbytes for _, f in self.active)
+
+  def _matmat(self, X: np.ndarray) -> np.ndarray:
+    n = len(self.factors)
+    tensor = np.asarray(X).reshape([2] * n + [-1])
+    for axis, f in self.active:
+      tensor = _contract(tensor, f, axis)
+    return tensor.reshape(X.shape)
+
+  def _matvec(self, x: np.ndarray) -> np.ndarray:
+    return self._matmat(x.reshape(-1, 1)).reshape(x.shape)
+
+  def _adjoint(self) -> 'KronOperator':
+    return KronOperator([f.conj().T for f in self.factors])
+
+  def __add__(self, other):
+    if isinstance(other, (KronOperator, KronSum)):
+      return KronSum([self]) + other
+    return super().__add__(other)
+
+  def todense(self) -> np.ndarray:
+    """The materialised product, for checks on small sizes."""
+    result = np.ones((1, 1), dtype=complex)
+    for f in self.factors:
+      result = np.kron(result, f)
+    return result
+
+class KronSum(LinearOperator):
+  def __init__(self, terms: Sequence[KronOperator]):
+    self.terms: List[KronOperator] = list(terms)
+    super().__init__(dtype=np.dtype(complex), shape=self.terms[0].shape)
+
+  @property
+  def nbytes(self) -> int:
+    return sum(t.nbytes for t in self.terms)
+
+  def _matmat(self, X: np.ndarray) -> np.ndarray:
+    result = self.terms[0]._matmat(X)
+    for term in self.terms[1:]:
+      result = result + term._matmat(X)
+    return result
+
+  def _matvec(self, x: np.ndarray) -> np.ndarray:
+    return self._matmat(x.reshape(-1, 1)).reshape(x.shape)
+
+  def _adjoint(self) -> 'KronSum':
+    return KronSum([t._adjoint() for t in self.terms])
+
+  def __add__(self, other):
+    if isinstance(other, KronOperator):
+      return KronSum(self.terms + [other])
+    if isinstance(other, KronSum):
+      return KronSum(self.terms + other.terms)
+    return super().__add__(other)
+
+  def todense(self) -> np.ndarray:
+    return sum(t.todense() for t in self.terms)
+
+Factored = Union[KronOperator, KronSum]
+
+#########################
+### Permute-and-Scale ###
+#########################
+
+# kron(I, .., gate, .., I) for a single 2x2 gate on ``bit``: y = d0 * x +
+# d1 * P x, where P flips the bit and d0 / d1 take one of two values each
+# (the diagonal and off-diagonal entries of the gate, picked by the bit).
+# Nothing of size 2^n is stored; a matvec is one pass over a reshaped view.
+
+class PermScale(LinearOperator):
+  def __init__(self, dim: int, bit: int, gate: np.ndarray):
+    self.dim = dim
+    self.bit = bit
+    self.gate = np.asarray(gate, dtype=complex)
+    N = 2 ** dim
+    super().__init__(dtype=np.dtype(complex), shape=(N, N))
+
+  @property
+  def nbytes(self) -> int:
+    return self.gate.nbytes
+
+  def _matmat(self, X: np.ndarray) -> np.ndarray:
+    g = self.gate
+    x = np.asarray(X).reshape(2 ** self.bit, 2, -1)
+    y = np.empty(x.shape, dtype=np.result_type(x.dtype, g.dtype))
+    for b in (0, 1):
+      np.multiply(x[:, b], g[b, b], out=y[:, b])
+      y[:, b] += g[b, 1 - b] * x[:, 1 - b]
+    return y.reshape(X.shape)
+
+  def _matvec(self, x: np.ndarray) -> np.ndarray:
+    return self._matmat(x.reshape(-1, 1)).reshape(x.shape)
+
+  def _adjoint(self) -> 'PermScale':
+    return PermScale(self.dim, self.bit, self.gate.conj().T)
+
+  def todense(self) -> np.ndarray:
+    return KronOperator([
+      self.gate if axis == self.bit else I2 for axis in range(self.dim)
+    ]).todense()
+
+# vim:ts=2 sw=2 et:
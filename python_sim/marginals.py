@@ -0,0 +1,90 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+from .sampling import DEFAULT_CHUNK, Seed, probabilities
+
+#################
+### Marginals ###
+#################
+
+# Marginal probabilities and most likely outcomes without a full-size |a|^2
+# array. Qubit 0 is the most significant bit (the first factor of a kron),
+# as in the engines. The state is reduced in power-of-two chunks of
+# consecutive amplitudes: inside a chunk the low qubits vary and are summed
+# out with one reshape + sum, the high qubits are fixed by the chunk offset
+# and select where the partial sum lands. Memory is O(chunk + 2^k) for a
+# marginal over k qubits.
+
+def _chunk_bits(dim: int, chunk: int) -> int:
+  bits = max(int(chunk).bit_length() - 1, 0)
+  return min(bits, dim)
+
+def marginal(
+  state: np.ndarray,
+  qubits: Sequence[int],
+  chunk: int = DEFAULT_CHUNK,
+) -> np.ndarray:
+  """
+  Probabilities of the 2^k outcomes of ``qubits``; the first listed qubit is
+  the most significant bit of the outcome index.
+  """
+  state = state.reshape(-1)
+  dim = int(np.log2(len(state)))
+  qubits = list(qubits)
+  if len(set(qubits)) != len(qubits) or any(not 0 <= q < dim for q in qubits):
+    raise ValueError(f'invalid qubits {qubits} for a {dim} qubit state')
+
+  low_bits = _chunk_bits(dim, chunk)
+  split = dim - low_bits            # qubits >= split vary inside a chunk
+  ordered = sorted(qubits)
+  high = [q for q in ordered if q < split]
+  low = [q for q in ordered if q >= split]
+  summed = tuple(q - split for q in range(split, dim) if q not in low)
+
+  result = np.zeros([2] * len(ordered))
+  size = 1 << low_bits
+  for block in range(1 << split):
+    p = probabilities(state[block * size:(block + 1) * size]).reshape([2] * low_bits)
+    index = tuple((block >> (split - 1 - q)) & 1 for q in high)
+    result[index] += p.sum(axis=summed) if summed else p
+
+  # sorted qubit order -> requested order
+  result = result.transpose([ordered.index(q) for q in qubits])
+  return result.reshape(-1)
+
+def argmax(
+  state: np.ndarray,
+  qubits: Optional[Sequence[int]] = None,
+  chunk: int = DEFAULT_CHUNK,
+) -> int:
+  """
+  Most likely outcome of ``qubits`` (all qubits if None) as an integer, the
+  first listed qubit being the most significant bit.
+  """
+  state = state.reshape(-1)
+  if qubits is not None:
+    return int(np.argmax(marginal(state, qubits, chunk)))
+  best, best_p = 0, -1.0
+  for start in range(0, len(state), chunk):
+    p = probabilities(state[start:start + chunk])
+    i = int(np.argmax(p))
+    if p[i] > best_p:
+      best, best_p = start + i, p[i]
+  return best
+
+def measure(
+  state: np.ndarray,
+  qubits: Sequence[int],
+  shots: int = 1,
+  rng: Seed = None,
+  chunk: int = DEFAULT_CHUNK,
+) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Partial measurement of ``qubits``: ``shots`` outcomes drawn from their
+  marginal, and the marginal itself.
+  """
+  p = marginal(state, qubits, chunk)
+  outcomes = np.random.default_rng(rng).choice(len(p), size=shots, p=p / p.sum())
+  return outcomes, p
+
+# vim:ts=2 sw=2 et:
@@ -1,6 +1,10 @@
 import numpy as np
 from typing import List
 
+from . import twiddle
+from .instrument import phase
+from .marginals import argmax
+
 ##############
 ### States ###
 ##############
@@ -34,10 +38,7 @@ H = np.array([
   [1, -1]
 ], dtype=complex) * 1/np.sqrt(2)
 
-R = lambda k: np.array([
-  [1, 0],
-  [0, np.exp(2j * np.pi / (2 ** k))]
-], dtype=complex)
+R = twiddle.R # cached, read-only
 
 M00 = qs0 * qs0.conj().T
 M11 = qs1 * qs1.conj().T
@@ -47,47 +48,66 @@ MLIST = [M00, M11]
 ### Utils ###
 #############
 
-def kron(states: List[np.ndarray]) -> np.ndarray:
+def kron(states: List[np.ndarray], factored: bool = False) -> np.ndarray:
+    if factored:
+      # KronOperator: applied factor by factor, never materialised
+      from .kron_op import KronOperator
+      return KronOperator(states)
     result = states[0]
     for state in states[1:]:
       result = np.kron(result, state)
     return result
 
+@phase('apply')
 def apply(gate: np.ndarray, state: np.ndarray) -> np.ndarray:
   return gate @ state
 
+def bit_reverse(state: np.ndarray) -> np.ndarray:
+  """Reverse the qubit order, i.e. undo the swapped output of the QFTs."""
+  dim = int(np.log2(len(state)))
+  shape = state.shape
+  return state.reshape([2] * dim + list(shape[1:])) \
+    .transpose(list(reversed(range(dim))) + list(range(dim, dim + len(shape) - 1))) \
+    .reshape(shape)
+
+@phase('operator')
 def create(
     dim: int, 
     bits: List[int], 
-    gates: List[np.ndarray]
+    gates: List[np.ndarray],
+    factored: bool = False
 ) -> np.ndarray:
     base = [I for _ in range(dim)]
     for bit, gate in zip(bits, gates):
       base[bit] = apply(gate, base[bit])
-    return kron(base)
+    return kron(base, factored)
 
 ########################
 ### Controlled Gates ###
 ########################
 
+@phase('operator')
 def CG(
     dim: int,
     control: int = 0, 
     target: int = 1, 
-    gate: np.ndarray = X
+    gate: np.ndarray = X,
+    factored: bool = False
 ) -> np.ndarray:
     i0 = [I for _ in range(dim)]
     i1 = [I for _ in range(dim)]
     i0[control] = M00
     i1[control] = M11
     i1[target] = gate
-    return kron(i0) + kron(i1)
+    return kron(i0, factored) + kron(i1, factored)
 
+@phase('operator')
 def SCG(
     dim: int,
     control: int = 0, 
     targets: List[int] = [1], 
-    gates: List[np.ndarray] = [X]
+    gates: List[np.ndarray] = [X],
+    factored: bool = False
 ) -> np.ndarray:
     i0 = [I for _ in range(dim)]
     i1 = [I for _ in range(dim)]
@@ -95,35 +115,36 @@ def SCG(
     i1[control] = M11
     for i, target in enumerate(targets):
       i1[target] = gates[i]
-    return kron(i0) + kron(i1)
+    return kron(i0, factored) + kron(i1, factored)
 
 ####################
 ### QFT Variants ###
 ####################
 
-def QFT(state: np.ndarray) -> np.ndarray:
+def QFT(state: np.ndarray, factored: bool = False) -> np.ndarray:
   dim = int(np.log2(len(state)))
   for target in range(dim):
-    state = apply(create(dim, [target], [H]), state)
+    state = apply(create(dim, [target], [H], factored), state)
     for control in range(target+1, dim):
       state = apply(
-        CG(dim, control, target, R(control-target+1)),
+        CG(dim, control, target, R(control-target+1), factored),
         state
       )
   return state # NOTE: swapped bit order now
 
-def SQFT(state: np.ndarray) -> np.ndarray:
+def SQFT(state: np.ndarray, factored: bool = False) -> np.ndarray:
   dim = int(np.log2(len(state)))
   Rs = [R(i) for i in range(2, dim+1)]
   for bit in range(dim):
-    state = apply(create(dim, [bit], [H]), state)
+    state = apply(create(dim, [bit], [H], factored), state)
     if bit + 1 < dim:
       state = apply(
         SCG(
           dim,
           control=bit+1,
           targets=list(range(bit+1)),
-          gates=Rs[:bit+1][::-1]
+          gates=Rs[:bit+1][::-1],
+          factored=factored
         ),
         state
       )
@@ -132,15 +153,15 @@ def SQFT(state: np.ndarray) -> np.ndarray:
 def IQFT(state: np.ndarray) -> np.ndarray:
   raise NotImplemented
 
-def INVQFT(state: np.ndarray) -> np.ndarray:
+def INVQFT(state: np.ndarray, factored: bool = False) -> np.ndarray:
   dim = int(np.log2(len(state)))
   for target in reversed(range(dim)):
     for control in reversed(range(target+1, dim)):
       state = apply(
-        CG(dim, control, target, R(control-target+1).conj().T),
+        CG(dim, control, target, R(control-target+1, inverse=True), factored),
         state
       )
-    state = apply(create(dim, [target], [H]), state)
+    state = apply(create(dim, [target], [H], factored), state)
   return state # NOTE: swapped bit order now
 
 #############
@@ -171,8 +192,7 @@ def qadd(a: int, b: int) -> int:
   state = apply(phase_layer, state)
   state = INVQFT(state)
 
-  probs = np.abs(state).flatten() ** 2
-  return int(np.argmax(probs))
+  return argmax(state)
 
 # Optimized adder
 def qadd_optimized(a: int, b: int) -> int:
@@ -192,7 +212,7 @@ def qadd_optimized(a: int, b: int) -> int:
   a_idx = list(range(n))
   b_idx = list(range(n, 2 * n))
 
-  phase_cache = {k: np.exp(2j * np.pi / (2 ** k)) for k in range(1, n + 1)}
+  phases = twiddle.twiddles().phases(n)
 
   def apply_single_qubit(state: np.ndarray, gate: np.ndarray, target: int) -> np.ndarray:
     reshaped = state.reshape([2] * dim)
@@ -214,7 +234,7 @@ def qadd_optimized(a: int, b: int) -> int:
       state = apply_single_qubit(state, H, target)
       for j in range(i + 1, len(reg)):
         control = reg[j]
-        state = apply_controlled_phase(state, control, target, phase_cache[j - i + 1])
+        state = apply_controlled_phase(state, control, target, phases[j - i + 1])
     return state
 
   def inv_qft_on_register(state: np.ndarray, reg: List[int]) -> np.ndarray:
@@ -222,7 +242,7 @@ def qadd_optimized(a: int, b: int) -> int:
       target = reg[i]
       for j in reversed(range(i + 1, len(reg))):
         control = reg[j]
-        state = apply_controlled_phase(state, control, target, np.conjugate(phase_cache[j - i + 1]))
+        state = apply_controlled_phase(state, control, target, np.conjugate(phases[j - i + 1]))
       state = apply_single_qubit(state, H, target)
     return state
 
@@ -232,13 +252,12 @@ def qadd_optimized(a: int, b: int) -> int:
     for k, control in enumerate(b_idx):
       p = n - j - (n - 1 - k)
       if p >= 1:
-        state = apply_controlled_phase(state, control, target, phase_cache[p])
+        state = apply_controlled_phase(state, control, target, phases[p])
 
   state = inv_qft_on_register(state, a_idx)
 
-  probs = np.abs(state).reshape(2 ** n, 2 ** n) ** 2
-  a_marginal = probs.sum(axis=1)
-  return int(np.argmax(a_marginal))
+  # most likely value of the a register, without a full-size |a|^2 array
+  return argmax(state, a_idx)
 
 if __name__ == '__main__':
   print(qadd(100,200))
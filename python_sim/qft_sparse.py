@@ -2,6 +2,10 @@ import numpy as np
 import scipy.sparse as sp
 from typing import List
 
+from . import twiddle
+from .instrument import phase
+from .spmv import matvec
+
 ##############
 ### States ###
 ##############
@@ -35,10 +39,7 @@ H = np.array([
   [1, -1]
 ], dtype=complex) * 1/np.sqrt(2)
 
-R = lambda k: np.array([
-  [1, 0],
-  [0, np.exp(2j * np.pi / (2 ** k))]
-], dtype=complex)
+R = twiddle.R # cached, read-only
 
 M00 = qs0 * qs0.conj().T
 M11 = qs1 * qs1.conj().T
@@ -48,47 +49,104 @@ MLIST = [M00, M11]
 ### Utils ###
 #############
 
-def kron(states: List[np.ndarray]) -> np.ndarray:
-    result = states[0]
+# Storage format of the layers (``format``):
+#   csr   every layer is a CSR matrix
+#   auto  layers that are diagonal (controlled phases) are stored as
+#         dia_matrix, i.e. only the diagonal; a single non-diagonal gate on
+#         one qubit (the H layers) becomes a PermScale operator that stores
+#         just the 2x2 gate; everything else is CSR
+# ``factored=True`` overrides both with KronOperators.
+# With ``auto`` every QFT layer is DIA or PermScale, so the row-parallel CSR
+# matvec of spmv only runs with ``format='csr'``.
+
+FORMATS = ('auto', 'csr')
+
+def check_format(format: str) -> None:
+  if format not in FORMATS:
+    raise ValueError(f'unknown format {format!r} (choose from {", ".join(FORMATS)})')
+
+def is_diagonal(gate: np.ndarray) -> bool:
+  gate = np.asarray(gate)
+  return not np.any(gate - np.diag(np.diag(gate)))
+
+def diagonal(states: List[np.ndarray]) -> np.ndarray:
+  """Diagonal of the kron of diagonal factors."""
+  result = np.ones(1, dtype=complex)
+  for state in states:
+    result = np.kron(result, np.diag(state))
+  return result
+
+def dia(d: np.ndarray) -> sp.dia_matrix:
+  return sp.dia_matrix((d[None, :], [0]), shape=(len(d), len(d)))
+
+def kron(states: List[np.ndarray], factored: bool = False) -> np.ndarray:
+    if factored:
+      from .kron_op import KronOperator
+      return KronOperator(states)
+    # sparse factors: a dense factor would make scipy build BSR blocks
+    # whose explicit zeros multiply with every further factor
+    result = sp.coo_matrix(states[0])
     for state in states[1:]:
-      result = sp.kron(result, state)
-    return result
+      result = sp.kron(result, sp.coo_matrix(state), format='coo')
+    return result.tocsr()
 
+@phase('apply')
 def apply(gate: np.ndarray, state: np.ndarray) -> np.ndarray:
-  return gate @ state
+  # CSR gates are multiplied row-parallel above spmv.PARALLEL_MIN_NNZ
+  return matvec(gate, state)
 
+@phase('operator')
 def create(
     dim: int, 
     bits: List[int], 
-    gates: List[np.ndarray]
+    gates: List[np.ndarray],
+    factored: bool = False,
+    format: str = 'auto'
 ) -> np.ndarray:
     base = [I for _ in range(dim)]
     for bit, gate in zip(bits, gates):
       base[bit] = apply(gate, base[bit])
-    return kron(base)
+    if format == 'auto' and not factored:
+      if all(is_diagonal(b) for b in base):
+        return dia(diagonal(base))
+      if len(bits) == 1:
+        from .kron_op import PermScale
+        return PermScale(dim, bits[0], base[bits[0]])
+    return kron(base, factored)
 
 ########################
 ### Controlled Gates ###
 ########################
 
+def controlled(i0: List[np.ndarray], i1: List[np.ndarray], factored: bool, format: str):
+    if format == 'auto' and not factored and all(is_diagonal(g) for g in i0 + i1):
+      return dia(diagonal(i0) + diagonal(i1))
+    return kron(i0, factored) + kron(i1, factored)
+
+@phase('operator')
 def CG(
     dim: int,
     control: int = 0, 
     target: int = 1, 
-    gate: np.ndarray = X
+    gate: np.ndarray = X,
+    factored: bool = False,
+    format: str = 'auto'
 ) -> np.ndarray:
     i0 = [I for _ in range(dim)]
     i1 = [I for _ in range(dim)]
     i0[control] = M00
     i1[control] = M11
     i1[target] = gate
-    return kron(i0) + kron(i1)
+    return controlled(i0, i1, factored, format)
 
+@phase('operator')
 def SCG(
     dim: int,
     control: int = 0, 
     targets: List[int] = [1], 
-    gates: List[np.ndarray] = [X]
+    gates: List[np.ndarray] = [X],
+    factored: bool = False,
+    format: str = 'auto'
 ) -> np.ndarray:
     i0 = [I for _ in range(dim)]
     i1 = [I for _ in range(dim)]
@@ -96,35 +154,39 @@ def SCG(
     i1[control] = M11
     for i, target in enumerate(targets):
       i1[target] = gates[i]
-    return kron(i0) + kron(i1)
+    return controlled(i0, i1, factored, format)
 
 ####################
 ### QFT Variants ###
 ####################
 
-def QFTS(state: np.ndarray) -> np.ndarray:
+def QFTS(state: np.ndarray, factored: bool = False, format: str = 'auto') -> np.ndarray:
+  check_format(format)
   dim = int(np.log2(len(state)))
   for target in range(dim):
-    state = apply(create(dim, [target], [H]), state)
+    state = apply(create(dim, [target], [H], factored, format), state)
     for control in range(target+1, dim):
       state = apply(
-        CG(dim, control, target, R(control-target+1)),
+        CG(dim, control, target, R(control-target+1), factored, format),
         state
       )
   return state # NOTE: swapped bit order now
 
-def SQFTS(state: np.ndarray) -> np.ndarray:
+def SQFTS(state: np.ndarray, factored: bool = False, format: str = 'auto') -> np.ndarray:
+  check_format(format)
   dim = int(np.log2(len(state)))
   Rs = [R(i) for i in range(2, dim+1)]
   for bit in range(dim):
-    state = apply(create(dim, [bit], [H]), state)
+    state = apply(create(dim, [bit], [H], factored, format), state)
     if bit + 1 < dim:
       state = apply(
         SCG(
           dim,
           control=bit+1,
           targets=list(range(bit+1)),
-          gates=Rs[:bit+1][::-1]
+          gates=Rs[:bit+1][::-1],
+          factored=factored,
+          format=format
         ),
         state
       )
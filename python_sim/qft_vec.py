@@ -0,0 +1,168 @@
+import numpy as np
+from functools import lru_cache
+from typing import Optional
+
+from .checkpoint import Checkpoint, digest
+from .instrument import phase
+from .twiddle import _readonly, phase as twiddle, twiddles
+
+############
+### Util ###
+############
+
+h = 1 / np.sqrt(2)
+
+def rotation(k: int) -> np.ndarray:
+  """Diagonal of R(k): [1, exp(2 pi i / 2^k)]."""
+  return np.array([1, twiddle(k)], dtype=complex)
+
+def rotations(target: int, start: int = 0, prefix: int = 0) -> np.ndarray:
+  """
+  Phases picked up by the |1> half of ``target`` from the already
+  transformed qubits, indexed by the qubits ``start..target-1``. Qubits
+  ``0..start-1`` are fixed to the bits of ``prefix`` (MSB first) and only
+  contribute a scalar; ``start=0`` gives the full 2^target table.
+  """
+  if start == 0:
+    return twiddles().rots(target)
+  rots = np.ones(1, dtype=complex)
+  for q in range(start, target):
+    rots = np.kron(rots, rotation(target + 1 - q))
+  for q in range(start):
+    if (prefix >> (start - 1 - q)) & 1:
+      rots *= twiddle(target + 1 - q)
+  return rots
+
+@phase('apply')
+def stage(
+  state: np.ndarray,
+  target: int,
+  rots: np.ndarray,
+  out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+  """
+  One stacked stage on a flat state: the |1> half of qubit ``target`` is
+  rotated by ``rots`` (indexed by the qubits above the target), then the
+  Hadamard mixes both halves. Written to ``out`` if given, else in place.
+  """
+  x = state.reshape(2 ** target, 2, -1)
+  y = x if out is None else out.reshape(x.shape)
+  v1 = x[:, 0, :].copy() if out is None else x[:, 0, :]
+  v2 = x[:, 1, :] * rots[:, None]
+  np.add(v1, v2, out=y[:, 0, :])
+  np.subtract(v1, v2, out=y[:, 1, :])
+  y *= h
+  return state if out is None else out
+
+##########################
+### Vectorized Stacked ###
+##########################
+
+# Port of Matlab/QFT6 (stacked QFT V3): instead of building a 2^n x 2^n
+# operator per stage, every stage reshapes the state to
+# [outer (2^i), target bit (2), inner] and applies the controlled phases as
+# an elementwise product over the outer axis followed by the Hadamard.
+# O(n 2^n) work; a stage allocates two half-size temporaries (the copy of
+# the |0> half and the rotated |1> half), i.e. one state's worth of memory.
+# The rotation vectors come from the shared twiddle table, which grows them
+# incrementally: rots_{i+1} = kron(R(i+2), rots_i).
+# A (2^n, K) matrix of K states is transformed column by column at once.
+#
+# With a Checkpoint the state after every checkpointed stage is written in
+# the background, and a run resumes after the last completed stage of a
+# checkpoint of the same input (dimension plus a digest of all amplitudes)
+# instead of starting over. Stages then alternate between two buffers, so a
+# stage never overwrites the buffer that is still being written. A finished
+# transform clears its checkpoint.
+
+def SQFTV(state: np.ndarray, checkpoint: Optional[Checkpoint] = None) -> np.ndarray:
+  dim = int(np.log2(len(state)))
+  shape = state.shape
+  start = 0
+  if checkpoint is not None:
+    meta = {'engine': 'SQFTV', 'dim': dim, 'input': digest(np.asarray(state, dtype=complex))}
+    resumed = checkpoint.load()
+    if resumed is not None and all(resumed[2].get(k) == v for k, v in meta.items()) \
+       and tuple(resumed[2]['shape']) == (state.size,):
+      start, state = resumed[0] + 1, resumed[1]
+  if start == 0:
+    state = np.array(state, dtype=complex).reshape(-1)
+  spare, pending = None, {}
+  for target, rots in zip(range(start, dim), twiddles().stages(start, dim)):
+    if checkpoint is None:
+      state = stage(state, target, rots)
+    else:
+      if spare is None:
+        spare = np.empty_like(state)
+      if id(spare) in pending:
+        pending.pop(id(spare)).result()
+      state, spare = stage(state, target, rots, out=spare), state
+      if checkpoint.wants(target):
+        pending[id(state)] = checkpoint.save(target, state, **meta)
+  if checkpoint is not None:
+    checkpoint.wait()
+    checkpoint.clear()
+  return state.reshape(shape) # NOTE: swapped bit order now
+
+#############################
+### Higher-Radix Stacked ###
+#############################
+
+# SQFTV with r = log2(radix) consecutive qubits per pass over the state.
+# Within a block of qubits i..i+r-1 the phases of stage i+j split into a
+# part from the outer qubits 0..i-1 (acting on bit j only, so it commutes
+# with the Hadamards of bits < j) and a part from the block's own bits.
+# The outer parts are folded into one twiddle per (outer index, block
+# index), T[o, b] = prod_j rots_{i+j}[o 2^j]^{b_j}; what is left is the same
+# fixed 2^r x 2^r butterfly F for every block (the r-qubit stacked QFT).
+# A pass is a twiddle multiply and a small matmul, done chunk by chunk so
+# the temporary stays at ``chunk`` amplitudes: ceil(n / r) passes over the
+# state instead of n, for 2^r instead of 2 multiply-adds per amplitude.
+
+RADICES = (2, 4, 8)
+DEFAULT_CHUNK = 1 << 20     # amplitudes per twiddle / butterfly block
+
+@lru_cache(maxsize=None)
+def butterfly(r: int) -> np.ndarray:
+  """The fixed 2^r x 2^r butterfly of a radix-2^r pass."""
+  return _readonly(SQFTV(np.eye(2 ** r, dtype=complex)))
+
+def outer_twiddles(target: int, r: int, lo: int, hi: int) -> np.ndarray:
+  """T[o - lo, b] for the outer indices ``lo..hi-1`` of the block at ``target``."""
+  T = np.ones((hi - lo, 1), dtype=complex)
+  for j, rots in enumerate(twiddles().stages(target, target + r)):
+    a = rots[lo << j:hi << j:1 << j]
+    T = (T[:, :, None] * np.stack([np.ones_like(a), a], axis=1)[:, None, :]).reshape(hi - lo, -1)
+  return T
+
+@phase('apply')
+def radix_stage(state: np.ndarray, target: int, r: int, chunk: int = DEFAULT_CHUNK) -> np.ndarray:
+  """One radix-2^r pass over qubits ``target..target+r-1`` of a flat state, in place."""
+  x = state.reshape(2 ** target, 2 ** r, -1)
+  F = butterfly(r)
+  inner = max(chunk // 2 ** r, 1)
+  step = max(inner // x.shape[2], 1)
+  for lo in range(0, len(x), step):
+    hi = min(lo + step, len(x))
+    T = outer_twiddles(target, r, lo, hi)[:, :, None]
+    for k in range(0, x.shape[2], inner):
+      view = x[lo:hi, :, k:k + inner]
+      block = view * T
+      if view.shape[2] == 1:
+        np.matmul(block[:, :, 0], F.T, out=view[:, :, 0])
+      else:
+        np.matmul(F, block, out=view)
+  return state
+
+def SQFTR(state: np.ndarray, radix: int = 4, chunk: int = DEFAULT_CHUNK) -> np.ndarray:
+  if radix not in RADICES:
+    raise ValueError(f'radix must be one of {RADICES}, not {radix}')
+  dim = int(np.log2(len(state)))
+  shape = state.shape
+  state = np.array(state, dtype=complex).reshape(-1)
+  r = int(np.log2(radix))
+  for target in range(0, dim, r):
+    radix_stage(state, target, min(r, dim - target), chunk)
+  return state.reshape(shape) # NOTE: swapped bit order now
+
+# vim:ts=2 sw=2 et:
@@ -0,0 +1,89 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+try:
+  from scipy.sparse import _sparsetools
+  _sparsetools.csr_matvec, _sparsetools.csr_matvecs
+except (ImportError, AttributeError):
+  _sparsetools = None
+
+#####################
+### Parallel SpMV ###
+#####################
+
+# CSR matrix-vector products split by rows over a thread pool. Every thread
+# runs scipy's csr_matvec / csr_matvecs kernel (which releases the GIL) on
+# its own row range: the kernel gets the slice of indptr for that range (the
+# offsets stay absolute, so indices and data are shared as is) and writes
+# the matching rows of the result. Ranges hold about the same number of
+# nonzeros. Below PARALLEL_MIN_NNZ nonzeros, for a single thread and for
+# anything that is not CSR the product is left to scipy.
+#
+# The kernels are private scipy API (scipy.sparse._sparsetools, tested with
+# scipy 1.17). If they are missing or their signature changes, every
+# range falls back to the public ``A[r0:r1] @ x``, which copies the rows'
+# slice of the matrix but still runs in parallel.
+#
+# PYTHON_SIM_THREADS sets the default thread count (default: all cores).
+
+PARALLEL_MIN_NNZ = 1 << 18
+
+_executors: Dict[int, ThreadPoolExecutor] = {}
+
+def default_threads() -> int:
+  return int(os.environ.get('PYTHON_SIM_THREADS', 0)) or os.cpu_count() or 1
+
+def _executor(threads: int) -> ThreadPoolExecutor:
+  if threads not in _executors:
+    _executors[threads] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='spmv')
+  return _executors[threads]
+
+def row_ranges(indptr: np.ndarray, parts: int) -> np.ndarray:
+  """Row boundaries splitting the rows into ``parts`` ranges of about equal nnz."""
+  bounds = np.searchsorted(indptr, np.linspace(0, indptr[-1], parts + 1), side='left')
+  bounds[0], bounds[-1] = 0, len(indptr) - 1
+  return np.unique(bounds)
+
+def matvec(
+  A,
+  x: np.ndarray,
+  threads: Optional[int] = None,
+  min_nnz: int = PARALLEL_MIN_NNZ,
+) -> np.ndarray:
+  """``A @ x`` for a vector or a (rows, K) matrix of K vectors."""
+  threads = default_threads() if threads is None else threads
+  if not (sp.issparse(A) and A.format == 'csr') or threads <= 1 or A.nnz < min_nnz \
+     or np.ndim(x) not in (1, 2):
+    return A @ x
+  dtype = np.result_type(A.dtype, x.dtype)
+  data = A.data.astype(dtype, copy=False)
+  x = np.ascontiguousarray(x, dtype=dtype)
+  n_row, n_col = A.shape
+  y = np.zeros((n_row,) + x.shape[1:], dtype=dtype)
+
+  def rows(r0: int, r1: int) -> None:
+    global _sparsetools
+    if _sparsetools is not None:
+      try:
+        if x.ndim == 1:
+          _sparsetools.csr_matvec(r1 - r0, n_col, A.indptr[r0:r1 + 1], A.indices, data, x, y[r0:r1])
+        else:
+          _sparsetools.csr_matvecs(
+            r1 - r0, n_col, x.shape[1], A.indptr[r0:r1 + 1], A.indices, data,
+            x.ravel(), y[r0:r1].ravel(),
+          )
+        return
+      except TypeError:
+        _sparsetools = None
+    y[r0:r1] = A[r0:r1] @ x
+
+  bounds = row_ranges(A.indptr, threads)
+  futures = [_executor(threads).submit(rows, r0, r1) for r0, r1 in zip(bounds[:-1], bounds[1:])]
+  for future in futures:
+    future.result()
+  return y
+
+# vim:ts=2 sw=2 et:
@@ -0,0 +1,93 @@
+import numpy as np
+from functools import lru_cache
+from typing import Iterator, List
+
+################
+### Twiddles ###
+################
+
+# Rotation phases and the per-stage rotation vectors of the stacked QFT,
+# computed once per process and shared by the forward, inverse and adder
+# code. phase(k) = exp(2 pi i / 2^k), R(k) = diag(1, phase(k)).
+#
+# Stage i of the stacked QFT multiplies the |1> half of qubit i by
+# rots_i = kron(R(i+1), ..., R(2)) (diagonals), built incrementally:
+# rots_{i+1} = kron([1, phase(i+2)], rots_i). The vectors do not depend on
+# the number of qubits, so there is one table per dtype, shared by all
+# sizes and grown on demand. rots_i has 2^i entries, so the table only keeps
+# the leading stages that fit into cache_bytes; larger ones are rebuilt
+# from the last kept one when needed.
+
+CACHE_BYTES = 1 << 28       # stage vectors kept per dtype (256 MiB)
+
+def _readonly(a: np.ndarray) -> np.ndarray:
+  a.flags.writeable = False
+  return a
+
+@lru_cache(maxsize=None)
+def phase(k: int, dtype: str = 'complex128') -> complex:
+  return np.dtype(dtype).type(np.exp(2j * np.pi / 2 ** k))
+
+@lru_cache(maxsize=None)
+def R(k: int, inverse: bool = False, dtype: str = 'complex128') -> np.ndarray:
+  """The 2x2 rotation gate (read-only); ``inverse`` gives its adjoint."""
+  p = phase(k, dtype)
+  return _readonly(np.array([
+    [1, 0],
+    [0, np.conj(p) if inverse else p]
+  ], dtype=dtype))
+
+class TwiddleTable:
+  def __init__(self, dtype: str = 'complex128', cache_bytes: int = CACHE_BYTES):
+    self.dtype = np.dtype(dtype)
+    self.cache_bytes = cache_bytes
+    self._rots: List[np.ndarray] = [_readonly(np.ones(1, dtype=self.dtype))]
+
+  @property
+  def nbytes(self) -> int:
+    return sum(r.nbytes for r in self._rots)
+
+  def phases(self, n: int) -> np.ndarray:
+    """phase(0), ..., phase(n + 1)."""
+    return np.array([phase(k, self.dtype.str) for k in range(n + 2)])
+
+  def rotation(self, k: int) -> np.ndarray:
+    """Diagonal of R(k)."""
+    return np.array([1, phase(k, self.dtype.str)], dtype=self.dtype)
+
+  def _next(self, i: int, rots: np.ndarray) -> np.ndarray:
+    """rots_{i+1} from rots_i, kept if it still fits into the cache."""
+    if i + 1 < len(self._rots):
+      return self._rots[i + 1]
+    rots = np.kron(self.rotation(i + 2), rots)
+    if i + 1 == len(self._rots) and self.nbytes + rots.nbytes <= self.cache_bytes:
+      self._rots.append(_readonly(rots))
+    return rots
+
+  def rots(self, i: int) -> np.ndarray:
+    """Rotation vector of stage ``i`` (2^i entries, read-only if cached)."""
+    j = min(i, len(self._rots) - 1)
+    rots = self._rots[j]
+    for k in range(j, i):
+      rots = self._next(k, rots)
+    return rots
+
+  def stages(self, start: int, stop: int) -> Iterator[np.ndarray]:
+    """rots_start, ..., rots_{stop-1}, each built from the previous one."""
+    if start >= stop:
+      return
+    rots = self.rots(start)
+    for i in range(start, stop):
+      yield rots
+      if i + 1 < stop:
+        rots = self._next(i, rots)
+
+@lru_cache(maxsize=None)
+def _table(dtype: str) -> TwiddleTable:
+  return TwiddleTable(dtype)
+
+def twiddles(dtype='complex128') -> TwiddleTable:
+  """The shared table of ``dtype``."""
+  return _table(np.dtype(dtype).str)
+
+# vim:ts=2 sw=2 et:
@@ -0,0 +1,8 @@
+systemd-run --scope \
+  bash -lc '
+    source ~/.venv_q/bin/activate
+    exec python -u -m bench run -n 1:28 \
+      -b python_sim:SQFTS,max_dim=20 \
+      -b qiskit_aer \
+      -b pennylane:lightning.qubit
+  ' | tee -a bench_results.txt